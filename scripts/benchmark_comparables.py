@@ -0,0 +1,99 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmark_predict import make_quotes
+from benchmark_snapshots import make_processed_data, timed
+from data_pipeline.schema import PROCESSED_SCHEMA, enforce_schema
+from features.encoder import FeatureEncoder
+from features.store import version_dir, write_feature_part
+from models.comparables import (
+    find_comparables,
+    load_comparables_index,
+    to_vectors,
+    update_comparables_index,
+)
+from models.predict import quotes_to_df
+from utils.io_utils import save_bundle
+
+
+def make_scan(index, data, features):
+    """
+    The comparables without the index: every listing is filtered on make and model and
+    the matching ones are compared to the quote, like a query on the production table.
+    """
+    vectors = to_vectors(index, features)
+    makes = data["detail_make"].astype(str).to_numpy()
+    models = data["detail_model"].astype(str).to_numpy()
+
+    def scan(quotes, k=5):
+        quote_vectors = to_vectors(index, index["encoder"].transform(quotes))
+        results = []
+        for vector, make, model in zip(
+            quote_vectors, quotes["detail_make"], quotes["detail_model"]
+        ):
+            (matches,) = np.nonzero((makes == make) & (models == model))
+            distances = np.sqrt(((vectors[matches] - vector) ** 2).sum(axis=1))
+            results.append(data.iloc[matches[np.argsort(distances)[:k]]])
+
+        return results
+
+    return scan
+
+
+def percentiles(func, quotes):
+    latencies = []
+    for i in range(len(quotes)):
+        quote = quotes.iloc[i : i + 1]
+        start = time.perf_counter()
+        func(quote)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return np.percentile(latencies, [50, 99])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Comparables: KD-tree index vs scanning the listings, and its updates."
+    )
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--new-rows", type=int, default=5_000)
+    parser.add_argument("--quotes", type=int, default=500)
+    args = parser.parse_args()
+
+    data = enforce_schema(
+        make_processed_data(args.rows + args.new_rows), PROCESSED_SCHEMA
+    )
+    encoder = FeatureEncoder()
+    features = encoder.fit_transform(data, data["detail_price"])
+    quotes = quotes_to_df(make_quotes(args.quotes))
+
+    with tempfile.TemporaryDirectory() as root:
+        directory = version_dir(root, 1)
+        index_path = os.path.join(root, "comparables.joblib")
+        save_bundle({"encoder": encoder}, os.path.join(directory, "encoder.joblib"))
+
+        write_feature_part(data.iloc[: args.rows], features[: args.rows], directory)
+        _, build_time = timed(update_comparables_index, root, index_path)
+
+        write_feature_part(data.iloc[args.rows :], features[args.rows :], directory)
+        _, update_time = timed(update_comparables_index, root, index_path)
+
+        os.remove(index_path)
+        _, rebuild_time = timed(update_comparables_index, root, index_path)
+        index, load_time = timed(load_comparables_index, index_path)
+
+        index_p50, index_p99 = percentiles(lambda q: find_comparables(index, q), quotes)
+        scan = make_scan(index, data, features)
+        scan_p50, scan_p99 = percentiles(scan, quotes)
+
+    print(f"Synthetic listings: {args.rows} + {args.new_rows} new")
+    print(f"build         | {build_time:6.2f}s")
+    print(f"update        | {update_time:6.2f}s with {args.new_rows} new listings")
+    print(f"full rebuild  | {rebuild_time:6.2f}s")
+    print(f"load          | {load_time:6.2f}s")
+    print(f"index query   | p50: {index_p50:6.2f} ms | p99: {index_p99:6.2f} ms")
+    print(f"scan query    | p50: {scan_p50:6.2f} ms | p99: {scan_p99:6.2f} ms")
@@ -0,0 +1,88 @@
+import argparse
+import time
+
+import pandas as pd
+
+from data_pipeline.extract import initialize_df, rows_to_df
+
+
+def make_listing(i):
+    return {
+        "listing_id": f"prd-{i}",
+        "dealer_id": str(300000 + i % 500),
+        "listing_title": f"2020 Toyota Hilux G 4x2 A/T {i}",
+        "listing_price": "  ₱1,048,000  ",
+        "listing_location": " Metro Manila, Quezon City ",
+        "listing_url": f"/toyota-hilux-for-sale-in-quezon-city/aid{i}",
+        "detail_date_posted": "Posted on 20/08/2024",
+        "detail_make": "Toyota",
+        "detail_model": "Hilux",
+        "detail_year": "2020",
+        "detail_status": "Used",
+        "detail_color": "Silver",
+        "detail_transmission": "Automatic",
+        "detail_mileage": "28,800km",
+        "detail_coding": "5/6 - Wednesday",
+        "detail_features": ["Driver and Passenger Airbags"],
+        "negotiation_and_test_drive": ["Negotiable", "Test drive available"],
+        "additional_services": ["Financing", "Trade in"],
+        "complete_listing_description": "First owned. Good running condition.",
+        "detail_price": "₱ 1,048,000",
+    }
+
+
+def bench_concat(n_rows, report_every):
+    """
+    The previous accumulation: one DataFrame and one pd.concat per scraped listing.
+    """
+    car_data = initialize_df()
+    start = last = time.perf_counter()
+    for i in range(1, n_rows + 1):
+        new_data = pd.DataFrame([make_listing(i)], columns=car_data.columns)
+        car_data = pd.concat([car_data, new_data], ignore_index=True)
+        if i % report_every == 0:
+            now = time.perf_counter()
+            print(
+                f"concat | rows: {i:>7} | per row: {(now - last) / report_every * 1e6:9.1f} us"
+            )
+            last = now
+
+    return time.perf_counter() - start
+
+
+def bench_buffer(n_rows, report_every):
+    """
+    The row buffer used by `extract`: append dicts, build the DataFrame once.
+    """
+    car_rows = []
+    start = last = time.perf_counter()
+    for i in range(1, n_rows + 1):
+        car_rows.append(make_listing(i))
+        if i % report_every == 0:
+            now = time.perf_counter()
+            print(
+                f"buffer | rows: {i:>7} | per row: {(now - last) / report_every * 1e6:9.1f} us"
+            )
+            last = now
+
+    build_start = time.perf_counter()
+    rows_to_df(car_rows)
+    print(f"buffer | DataFrame built in {time.perf_counter() - build_start:.2f}s")
+
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Per-row cost of accumulating scraped listings into a DataFrame."
+    )
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--concat-rows", type=int, default=5_000)
+    parser.add_argument("--report-every", type=int, default=1_000)
+    args = parser.parse_args()
+
+    concat_total = bench_concat(args.concat_rows, args.report_every)
+    buffer_total = bench_buffer(args.rows, args.report_every * 10)
+
+    print(f"concat | {args.concat_rows} rows in {concat_total:.2f}s")
+    print(f"buffer | {args.rows} rows in {buffer_total:.2f}s")
@@ -0,0 +1,47 @@
+import argparse
+import os
+import tempfile
+
+import numpy as np
+
+from benchmark_snapshots import make_processed_data, timed
+from data_pipeline.schema import PROCESSED_SCHEMA, enforce_schema
+from features.encoder import FeatureEncoder
+from features.store import load_feature_store, write_feature_part
+from utils.io_utils import save_bundle
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Feature store: full refit vs incremental update, and loading it back."
+    )
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--new-rows", type=int, default=2_000)
+    args = parser.parse_args()
+
+    data = enforce_schema(
+        make_processed_data(args.rows + args.new_rows), PROCESSED_SCHEMA
+    )
+    history, new = data.iloc[: args.rows], data.iloc[args.rows :]
+
+    encoder = FeatureEncoder()
+    features, fit_time = timed(encoder.fit_transform, history, history["detail_price"])
+    _, refit_time = timed(FeatureEncoder().fit_transform, data, data["detail_price"])
+    new_features, update_time = timed(encoder.transform, new)
+
+    with tempfile.TemporaryDirectory() as directory:
+        save_bundle(
+            {"encoder": encoder}, os.path.join(directory, "v1", "encoder.joblib")
+        )
+        write_feature_part(history, features, os.path.join(directory, "v1"))
+        (loaded, _, _), load_time = timed(load_feature_store, directory)
+        _, sum_time = timed(np.nansum, loaded, axis=0)
+
+    print(
+        f"Synthetic rows: {args.rows} + {args.new_rows} new, {features.shape[1]} features"
+    )
+    print(f"fit on history   | {fit_time:6.2f}s | {features.nbytes / 1e6:7.1f} MB")
+    print(f"refit with new   | {refit_time:6.2f}s")
+    print(
+        f"update with new  | {update_time:6.2f}s | {new_features.nbytes / 1e6:7.1f} MB"
+    )
+    print(f"load (mmap)      | {load_time:6.2f}s | first full scan: {sum_time:6.2f}s")
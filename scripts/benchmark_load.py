@@ -0,0 +1,46 @@
+import argparse
+import os
+import time
+
+from sqlalchemy import text
+
+from benchmark_extract_buffer import make_listing
+from data_pipeline.extract import rows_to_df
+from data_pipeline.load import load_to_staging_table
+from utils.db_utils import get_db_engine
+
+
+def bench_method(engine, data, table_name, method):
+    os.environ["LOAD_METHOD"] = method
+
+    start = time.perf_counter()
+    load_to_staging_table(engine, data, table_name)
+    elapsed = time.perf_counter() - start
+
+    with engine.connect() as connection:
+        loaded = connection.execute(text(f"SELECT COUNT(*) FROM {table_name}")).scalar()
+        connection.execute(text(f"DROP TABLE {table_name}"))
+        connection.commit()
+
+    if loaded != len(data):
+        raise RuntimeError(f"{method}: loaded {loaded} of {len(data)} rows.")
+
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Rows/sec of the staging loader with COPY vs multi-row INSERT."
+    )
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--db-name", default="staging")
+    parser.add_argument("--methods", nargs="+", default=["multi", "copy"])
+    args = parser.parse_args()
+
+    engine = get_db_engine(args.db_name)
+    data = rows_to_df([make_listing(i) for i in range(args.rows)])
+    print(f"Synthetic scrape: {len(data)} rows")
+
+    for method in args.methods:
+        seconds = bench_method(engine, data, f"benchmark_load_{method}", method)
+        print(f"{method:<5} | {seconds:7.2f}s | {len(data) / seconds:10,.0f} rows/sec")
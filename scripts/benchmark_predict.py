@@ -0,0 +1,133 @@
+import argparse
+import http.client
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingRegressor
+
+from benchmark_snapshots import make_processed_data
+from data_pipeline.schema import PROCESSED_SCHEMA, enforce_schema
+from features.encoder import FeatureEncoder
+from models.predict import Predictor
+from predict import create_server
+from utils.io_utils import save_bundle
+
+
+def make_bundle(n_rows):
+    """
+    A small model fitted on synthetic rows, standing in for a trained bundle.
+    """
+    data = enforce_schema(make_processed_data(n_rows), PROCESSED_SCHEMA)
+    encoder = FeatureEncoder()
+    features = encoder.fit_transform(data, data["detail_price"])
+    model = HistGradientBoostingRegressor(max_iter=200).fit(
+        features, data["detail_price"]
+    )
+
+    return {"model": model, "encoder": encoder}
+
+
+def make_quotes(n_quotes, seed=0):
+    rng = np.random.default_rng(seed)
+
+    return [
+        {
+            "make": str(rng.choice(["Toyota", "Honda", "Mitsubishi"])),
+            "model": str(rng.choice(["Hilux", "Vios", "Montero"])),
+            "year": int(rng.integers(2005, 2025)),
+            "mileage": int(rng.integers(0, 300_000)),
+            "transmission": str(rng.choice(["Automatic", "Manual"])),
+        }
+        for _ in range(n_quotes)
+    ]
+
+
+def run_clients(send, quotes, n_clients):
+    """
+    Sends `quotes` from `n_clients` concurrent threads, each through its own `send`
+    callable, and returns the latency of every quote in milliseconds.
+    """
+    latencies = [[] for _ in range(n_clients)]
+
+    def client(index):
+        client_send = send()
+        for quote in quotes[index::n_clients]:
+            start = time.perf_counter()
+            client_send(quote)
+            latencies[index].append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(n_clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return np.concatenate(latencies), elapsed
+
+
+def report(name, latencies, elapsed):
+    p50, p99 = np.percentile(latencies, [50, 99])
+    print(
+        f"{name:<16} | p50: {p50:6.2f} ms | p99: {p99:6.2f} ms | "
+        f"max: {latencies.max():6.2f} ms | {len(latencies) / elapsed:7.0f} quotes/s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Latency of the predictor under concurrent quotes, in process and over HTTP."
+    )
+    parser.add_argument("--quotes", type=int, default=5_000)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--train-rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    # Distinct mileages, so the cache is only hit in the last run
+    quotes = make_quotes(args.quotes)
+
+    with tempfile.TemporaryDirectory() as directory:
+        model_path = save_bundle(
+            make_bundle(args.train_rows), os.path.join(directory, "model.joblib")
+        )
+        predictor = Predictor(model_path)
+        server = create_server(predictor, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address
+
+        def quote_in_process():
+            return lambda quote: predictor.quote(**quote)
+
+        def quote_over_http():
+            connection = http.client.HTTPConnection(host, port)
+
+            def send(quote):
+                connection.request("POST", "/predict", body=json.dumps(quote))
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    raise RuntimeError(f"HTTP {response.status}")
+
+            return send
+
+        def predict_one_by_one():
+            return lambda quote: predictor.predict([quote])
+
+        # Warm up the model and the connections
+        predictor.predict(quotes[:100])
+
+        print(f"{args.quotes} quotes from {args.clients} concurrent clients")
+        report("unbatched", *run_clients(predict_one_by_one, quotes, args.clients))
+        report("batched", *run_clients(quote_in_process, quotes, args.clients))
+        predictor.cached_quote.cache_clear()
+        report("http", *run_clients(quote_over_http, quotes, args.clients))
+        report("http (cached)", *run_clients(quote_over_http, quotes, args.clients))
+
+        server.shutdown()
+        server.server_close()
+        predictor.close()
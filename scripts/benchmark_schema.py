@@ -0,0 +1,46 @@
+import argparse
+
+from benchmark_extract_buffer import make_listing
+from benchmark_snapshots import make_processed_data
+from data_pipeline.extract import rows_to_df
+from data_pipeline.schema import PROCESSED_SCHEMA, RAW_SCHEMA, enforce_schema
+
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 1e6
+
+
+# Dtypes the frames had before the schema: strings as object, integers as int64
+PREVIOUS_DTYPES = {"category": "object", "Int32": "int64"}
+
+
+def compare(name, typed, schema):
+    untyped = typed.astype(
+        {
+            col: PREVIOUS_DTYPES[dtype]
+            for col, dtype in schema.items()
+            if dtype in PREVIOUS_DTYPES
+        }
+    )
+    untyped_mb = memory_mb(untyped)
+    typed_mb = memory_mb(typed)
+
+    print(
+        f"{name:<9} | object: {untyped_mb:8.1f} MB | schema: {typed_mb:8.1f} MB | "
+        f"{untyped_mb / typed_mb:4.1f}x smaller"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Memory of the listing frames with and without the declared schema."
+    )
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    raw = rows_to_df([make_listing(i) for i in range(args.rows)])
+    processed = enforce_schema(make_processed_data(args.rows), PROCESSED_SCHEMA)
+
+    print(f"Synthetic listings: {args.rows} rows")
+    compare("raw", raw, RAW_SCHEMA)
+    compare("processed", processed, PROCESSED_SCHEMA)
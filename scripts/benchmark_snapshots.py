@@ -0,0 +1,118 @@
+import argparse
+import ast
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_pipeline.schema import LIST_COLUMNS, PROCESSED_SCHEMA, arrow_schema
+from utils.io_utils import read_snapshot, write_snapshot
+
+
+def make_processed_data(n_rows, seed=0):
+    """
+    Synthetic rows shaped like the output of `transform`.
+    """
+    rng = np.random.default_rng(seed)
+
+    return pd.DataFrame(
+        {
+            "listing_id": [f"prd-{i}" for i in range(n_rows)],
+            "dealer_id": rng.integers(300000, 301000, n_rows).astype(str),
+            "listing_title": rng.choice(
+                ["2020 toyota hilux g 4x2 a/t", "2017 toyota altis 1.6 g automatic"],
+                n_rows,
+            ),
+            "listing_location": rng.choice(
+                ["Metro Manila, Quezon City", "Cebu, Cebu City"], n_rows
+            ),
+            "listing_url": [
+                f"/toyota-hilux-for-sale-in-quezon-city/aid{i}" for i in range(n_rows)
+            ],
+            "detail_date_posted": pd.to_datetime("2024-09-12")
+            - pd.to_timedelta(rng.integers(0, 365, n_rows), unit="D"),
+            "detail_make": rng.choice(["Toyota", "Honda", "Mitsubishi"], n_rows),
+            "detail_model": rng.choice(["Hilux", "Vios", "Montero"], n_rows),
+            "detail_year": pd.array(rng.integers(2005, 2025, n_rows), dtype="Int16"),
+            "detail_status": rng.choice(["Used", "Brand New"], n_rows),
+            "detail_color": rng.choice(["Silver", "White", "Black", "Red"], n_rows),
+            "detail_transmission": rng.choice(["Automatic", "Manual"], n_rows),
+            "detail_mileage": rng.integers(0, 300_000, n_rows),
+            "detail_coding": rng.choice(["1/2 - Monday", "5/6 - Wednesday"], n_rows),
+            "detail_features": [
+                ["ABS", "Driver and Passenger Airbags"][: i % 3] for i in range(n_rows)
+            ],
+            "negotiation_and_test_drive": [["Negotiable"]] * n_rows,
+            "additional_services": [
+                ["Financing", "Trade in"][: i % 2] for i in range(n_rows)
+            ],
+            "complete_listing_description": rng.choice(
+                [
+                    "First owned\nGood running condition, see to appreciate.\n" * 5,
+                    "Casa maintained, all power, financing available.\n" * 3,
+                ],
+                n_rows,
+            ),
+            "detail_price": rng.integers(100_000, 5_000_000, n_rows),
+        }
+    )
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def read_csv(file_path):
+    """
+    The previous reader: dtypes and lists have to be recovered by hand.
+    """
+    df = pd.read_csv(file_path, parse_dates=["detail_date_posted"])
+    for col in LIST_COLUMNS:
+        df[col] = df[col].apply(ast.literal_eval)
+    return df
+
+
+def directory_size(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path)
+        for name in files
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="CSV vs Parquet (zstd) snapshots of the processed data."
+    )
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    data = make_processed_data(args.rows)
+    columns = ["detail_make", "detail_model", "detail_year", "detail_price"]
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, "processed_data.csv")
+        parquet_root = os.path.join(directory, "processed_data")
+
+        _, csv_write = timed(data.to_csv, csv_path, index=False)
+        _, csv_read = timed(read_csv, csv_path)
+        _, parquet_write = timed(
+            write_snapshot, data, parquet_root, schema=arrow_schema(PROCESSED_SCHEMA)
+        )
+        _, parquet_read = timed(read_snapshot, parquet_root)
+        _, projected_read = timed(read_snapshot, parquet_root, columns=columns)
+
+        print(f"Synthetic processed data: {len(data)} rows")
+        print(
+            f"csv     | write: {csv_write:6.2f}s | read: {csv_read:6.2f}s | "
+            f"size: {os.path.getsize(csv_path) / 1e6:7.1f} MB"
+        )
+        print(
+            f"parquet | write: {parquet_write:6.2f}s | read: {parquet_read:6.2f}s | "
+            f"size: {directory_size(parquet_root) / 1e6:7.1f} MB"
+        )
+        print(f"parquet | read of {len(columns)} columns: {projected_read:6.2f}s")
@@ -0,0 +1,61 @@
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmark_snapshots import make_processed_data
+from data_pipeline.schema import PROCESSED_SCHEMA, enforce_schema
+from features.encoder import FeatureEncoder
+from models.train import PARAM_GRID, cross_validate, make_model, summarize_runs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Duration of the cross-validated search and the final fit."
+    )
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--cv-max-rows", type=int, default=200_000)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--n-jobs", type=int, default=1)
+    args = parser.parse_args()
+
+    data = enforce_schema(make_processed_data(args.rows), PROCESSED_SCHEMA)
+    # Prices that depend on the listing, so boosting does not stop after a few trees
+    rng = np.random.default_rng(0)
+    base = data["detail_model"].map({"Hilux": 1.6e6, "Vios": 0.9e6, "Montero": 2.1e6})
+    age = 2024 - data["detail_year"].to_numpy(dtype="float64")
+    prices = (
+        base.to_numpy(dtype="float64")
+        * 0.9**age
+        * np.exp(-data["detail_mileage"].to_numpy(dtype="float64") / 1e6)
+        * rng.lognormal(0, 0.1, len(data))
+    )
+    data["detail_price"] = prices.astype("int32")
+    features = FeatureEncoder().fit_transform(data, prices)
+    makes = data["detail_make"]
+    del data
+
+    start = time.perf_counter()
+    runs, _ = cross_validate(
+        features,
+        prices,
+        makes,
+        PARAM_GRID,
+        n_folds=args.folds,
+        n_jobs=args.n_jobs,
+        max_rows=args.cv_max_rows,
+    )
+    search_time = time.perf_counter() - start
+
+    summary = summarize_runs(runs)
+    start = time.perf_counter()
+    make_model(json.loads(summary["params"].iloc[0])).fit(features, prices)
+    fit_time = time.perf_counter() - start
+
+    print(f"Synthetic listings: {args.rows}, {features.shape[1]} features")
+    print(
+        f"search | {len(runs)} fits on {min(args.rows, args.cv_max_rows)} rows, "
+        f"{args.n_jobs} processes: {search_time:7.1f}s"
+    )
+    print(f"fit    | best parameters on {args.rows} rows: {fit_time:7.1f}s")
+    print(summary.to_string(index=False))
@@ -0,0 +1,174 @@
+import argparse
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_pipeline.transform import (
+    transform_complete_desc,
+    transform_date_posted,
+    transform_list_cols,
+    transform_listing_location,
+    transform_mileage,
+    transform_price,
+)
+
+
+# Row-wise implementations the vectorized steps replaced, kept as the reference
+def rowwise_listing_location(df, col):
+    df[col] = df[col].apply(lambda x: x.strip())
+    return df
+
+
+def rowwise_date_posted(df, col, pattern):
+    df[col] = df[col].apply(lambda x: re.sub(pattern, "", x))
+    df[col] = pd.to_datetime(df[col], dayfirst=True)
+    return df
+
+
+def rowwise_mileage(df, col, pattern):
+    df[col] = df[col].apply(lambda x: -1 if pd.isna(x) else re.sub(pattern, "", x))
+    df[col] = df[col].apply(lambda x: -2 if x == "N/A" else int(x))
+    return df
+
+
+def rowwise_price(df, col, pattern):
+    df[col] = df[col].apply(lambda x: int(re.sub(pattern, "", x)))
+    df[col] = df[col].astype("int")
+    return df
+
+
+def rowwise_complete_desc(df, col, pattern):
+    df[col] = df[col].apply(
+        lambda x: "" if pd.isna(x) else re.sub(pattern, "", x).strip()
+    )
+    return df
+
+
+def rowwise_list_cols(df, cols, pattern):
+    for col in cols:
+        df[col] = df[col].apply(
+            lambda x: re.sub(pattern, "", x) if isinstance(x, str) else x
+        )
+        df[col] = df[col].apply(
+            lambda x: x.strip("[]").split(",") if isinstance(x, str) else x
+        )
+        df[col] = df[col].apply(lambda x: [item for item in x if item])
+    return df
+
+
+def make_staging_table(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+
+    days = rng.integers(1, 29, n_rows)
+    months = rng.integers(1, 13, n_rows)
+    mileage = rng.integers(0, 300_000, n_rows)
+    price = rng.integers(100_000, 5_000_000, n_rows)
+
+    mileage_text = pd.Series([f"{value:,}km" for value in mileage], dtype=object)
+    mileage_text[rng.random(n_rows) < 0.02] = "N/A"
+    mileage_text[rng.random(n_rows) < 0.02] = None
+
+    description = pd.Series(
+        rng.choice(
+            [
+                "First owned\r\n\r\nGood running condition  See to appreciate ",
+                "  Casa maintained\tAll power   Financing available",
+                "Cash or financing",
+            ],
+            n_rows,
+        ),
+        dtype=object,
+    )
+    description[rng.random(n_rows) < 0.05] = None
+
+    return pd.DataFrame(
+        {
+            "listing_location": rng.choice(
+                [
+                    " Metro Manila, Quezon City\n  ",
+                    " Cavite, Bacoor ",
+                    "Cebu, Cebu City",
+                ],
+                n_rows,
+            ),
+            "detail_date_posted": [
+                f"Posted on {day:02d}/{month:02d}/2024"
+                for day, month in zip(days, months)
+            ],
+            "detail_mileage": mileage_text,
+            "detail_price": [f"₱ {value:,}" for value in price],
+            "complete_listing_description": description,
+            "negotiation_and_test_drive": rng.choice(
+                ['{"",Negotiable,"","Test drive available",""}', '{"",Negotiable,""}'],
+                n_rows,
+            ),
+            "detail_features": rng.choice(
+                ['{"Driver and Passenger Airbags",ABS}', "{}"], n_rows
+            ),
+            "additional_services": rng.choice(
+                ['{Financing,Warranty,"Trade in"}', "{}"], n_rows
+            ),
+        }
+    )
+
+
+STEPS = [
+    (
+        "listing_location",
+        rowwise_listing_location,
+        transform_listing_location,
+        ("listing_location",),
+    ),
+    (
+        "date_posted",
+        rowwise_date_posted,
+        transform_date_posted,
+        ("detail_date_posted", r"Posted on "),
+    ),
+    ("mileage", rowwise_mileage, transform_mileage, ("detail_mileage", r"km|,")),
+    ("price", rowwise_price, transform_price, ("detail_price", r"₱ |,")),
+    (
+        "complete_desc",
+        rowwise_complete_desc,
+        transform_complete_desc,
+        ("complete_listing_description", r"[\r\n\t]+|\s{2,}"),
+    ),
+    (
+        "list_cols",
+        rowwise_list_cols,
+        transform_list_cols,
+        (
+            ["negotiation_and_test_drive", "detail_features", "additional_services"],
+            r'[{}"]',
+        ),
+    ),
+]
+
+
+def timed(func, df, args):
+    start = time.perf_counter()
+    result = func(df, *args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Row-wise vs vectorized transform steps on a synthetic staging table."
+    )
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    staging = make_staging_table(args.rows)
+    print(f"Synthetic staging table: {len(staging)} rows")
+
+    for name, rowwise, vectorized, step_args in STEPS:
+        expected, rowwise_seconds = timed(rowwise, staging.copy(), step_args)
+        actual, vectorized_seconds = timed(vectorized, staging.copy(), step_args)
+        pd.testing.assert_frame_equal(expected, actual)
+
+        print(
+            f"{name:<17} | row-wise: {rowwise_seconds:7.2f}s | vectorized: "
+            f"{vectorized_seconds:7.2f}s | speedup: {rowwise_seconds / vectorized_seconds:5.1f}x"
+        )
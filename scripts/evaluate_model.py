@@ -0,0 +1,48 @@
+import argparse
+
+from dotenv import load_dotenv
+
+from features.store import load_feature_store, version_dir
+from models.evaluate import evaluate_bundle
+from models.predict import MODEL_PATH
+from utils.io_utils import FEATURES_DIR, list_snapshot_dates, load_bundle
+
+load_dotenv()
+
+
+def run_evaluation(model_path=MODEL_PATH, load_dates=None):
+    bundle = load_bundle(model_path)
+    version = bundle["feature_version"]
+
+    # By default, the listings loaded after the model was trained
+    if load_dates is None:
+        trained_on = str(bundle["trained_at"].date())
+        load_dates = [
+            load_date
+            for load_date in list_snapshot_dates(version_dir(FEATURES_DIR, version))
+            if load_date > trained_on
+        ]
+        if not load_dates:
+            print("No listings loaded since training, evaluating on all of them.")
+            load_dates = None
+
+    features, rows, _ = load_feature_store(version=version, load_dates=load_dates)
+    overall, per_make = evaluate_bundle(bundle, features, rows)
+
+    print(
+        f"{len(rows)} listings | MAE: {overall['mae']:,.0f} | MAPE: {overall['mape']:.3f}"
+    )
+    print(per_make.to_string(index=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Evaluate the exported valuation model on the feature store."
+    )
+    parser.add_argument("--model-path", default=MODEL_PATH)
+    parser.add_argument(
+        "--load-dates", nargs="+", help="Load dates to evaluate on, as YYYY-MM-DD."
+    )
+    args = parser.parse_args()
+
+    run_evaluation(model_path=args.model_path, load_dates=args.load_dates)
@@ -0,0 +1,104 @@
+import json
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from dotenv import load_dotenv
+
+from models.predict import QUOTE_FIELDS, Predictor
+
+load_dotenv()
+
+PREDICT_HOST = os.getenv("PREDICT_HOST", "127.0.0.1")
+PREDICT_PORT = int(os.getenv("PREDICT_PORT", 8000))
+
+
+def make_handler(predictor: Predictor):
+    class PredictHandler(BaseHTTPRequestHandler):
+        """
+        `POST /predict` with one quote as a JSON object returns `{"price": ...}`, batched
+        and cached by the predictor. A JSON array of quotes returns `{"prices": [...]}`,
+        predicted in one call. `POST /comparables` with one quote, and optionally `k`,
+        returns `{"comparables": [...]}`. `GET /health` reports the loaded model.
+        """
+
+        # Keep connections open between requests, and send the headers and body without
+        # waiting for the ACK of the previous segment
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            if self.path != "/health":
+                return self.send_json(404, {"error": "Not found."})
+
+            has_comparables = predictor.comparables_index is not None
+            self.send_json(
+                200,
+                {
+                    "status": "ok",
+                    "model": predictor.model_path,
+                    "comparables": has_comparables,
+                },
+            )
+
+        def do_POST(self):
+            if self.path not in ("/predict", "/comparables"):
+                return self.send_json(404, {"error": "Not found."})
+
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length))
+
+                if self.path == "/comparables":
+                    if predictor.comparables_index is None:
+                        error = "No comparables index is loaded."
+                        return self.send_json(503, {"error": error})
+                    comparables = predictor.comparables(body, int(body.get("k", 5)))
+                    return self.send_json(200, {"comparables": comparables})
+
+                if isinstance(body, list):
+                    prices = predictor.predict(body)
+                    return self.send_json(200, {"prices": prices.tolist()})
+
+                price = predictor.quote(*(body[field] for field in QUOTE_FIELDS))
+            except (KeyError, TypeError, ValueError, AttributeError) as error:
+                return self.send_json(400, {"error": f"Invalid quote: {error}"})
+
+            self.send_json(200, {"price": price})
+
+        def send_json(self, status: int, payload: dict):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # One line per quote would dominate the cost of serving it
+            pass
+
+    return PredictHandler
+
+
+class PredictServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Clients connecting at once beyond the default backlog of 5 wait for a SYN retry
+    request_queue_size = 128
+
+
+def create_server(predictor: Predictor, host=PREDICT_HOST, port=PREDICT_PORT):
+    return PredictServer((host, port), make_handler(predictor))
+
+
+if __name__ == "__main__":
+    predictor = Predictor()
+    server = create_server(predictor)
+    print(f"Serving {predictor.model_path} on http://{PREDICT_HOST}:{PREDICT_PORT}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        predictor.close()
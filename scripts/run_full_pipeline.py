@@ -3,9 +3,10 @@ from datetime import datetime, timedelta
 
 from dotenv import load_dotenv
 
-from data_pipeline.extract import extract
-from data_pipeline.transform import transform
+from data_pipeline.extract import extract_chunks
+from data_pipeline.transform import transform_chunks
 from data_pipeline.load import extract_to_staging, transform_to_prod
+from utils.checkpoint_utils import ScrapeCheckpoint
 
 
 load_dotenv()
@@ -21,24 +22,40 @@ def run_pipeline(entrypoint, is_incremental=False):
     ui_DB_NAME_PRD = "production"
     ui_TBL_NAME_STG = f"raw_incremental_load_{ui_time_stamp}"
     ui_TBL_NAME_PRD = f"vehicle_data_prd"
+    ui_CHUNK_SIZE = 1000
+    ui_TRANSFORM_CHUNK_SIZE = 10000
+    ui_CHECKPOINT_PATH = "data/checkpoints/full_load.sqlite"
+
+    # Resume an interrupted run into the same staging table
+    checkpoint = ScrapeCheckpoint(ui_CHECKPOINT_PATH)
+    ui_TBL_NAME_STG = checkpoint.setdefault("staging_table", ui_TBL_NAME_STG)
 
     # Extract listings from website
-    data = extract(entrypoint, is_incremental=is_incremental)
+    data = extract_chunks(
+        entrypoint,
+        is_incremental=is_incremental,
+        chunk_size=ui_CHUNK_SIZE,
+        checkpoint=checkpoint,
+    )
 
-    # Load extracted data to the staging table in PostgreSQL
+    # Load extracted data to the staging table in PostgreSQL as it is scraped
     extract_to_staging(
         DB_NAME=ui_DB_NAME_STG,
         TBL_NAME=ui_TBL_NAME_STG,
         data=data,
         is_incremental=is_incremental,
+        checkpoint=checkpoint,
     )
 
-    # Transform the data loaded into the staging table
-    data = transform(
-        DB_NAME=ui_DB_NAME_STG, TBL_NAME=ui_TBL_NAME_STG, is_incremental=is_incremental
+    # Transform the data loaded into the staging table, streamed in chunks
+    data = transform_chunks(
+        DB_NAME=ui_DB_NAME_STG,
+        TBL_NAME=ui_TBL_NAME_STG,
+        is_incremental=is_incremental,
+        chunk_size=ui_TRANSFORM_CHUNK_SIZE,
     )
 
-    # Load to production table
+    # Load to production table as it is transformed
     transform_to_prod(
         DB_NAME=ui_DB_NAME_PRD,
         TBL_NAME=ui_TBL_NAME_PRD,
@@ -46,6 +63,10 @@ def run_pipeline(entrypoint, is_incremental=False):
         is_incremental=is_incremental,
     )
 
+    # The run has completed, the next one starts from page 1
+    checkpoint.clear()
+    checkpoint.close()
+
 
 if __name__ == "__main__":
     run_pipeline(entrypoint=entrypoint, is_incremental=False)
@@ -4,9 +4,14 @@ import time
 from datetime import datetime
 from dotenv import load_dotenv
 
-from data_pipeline.extract import extract
-from data_pipeline.transform import transform
-from data_pipeline.load import extract_to_staging, transform_to_prod
+from data_pipeline.extract import extract_chunks
+from data_pipeline.transform import transform_chunks
+from data_pipeline.load import extract_to_staging, get_listing_ids, transform_to_prod
+from models.comparables import update_comparables_index
+from models.refresh import refresh_model
+from utils.db_utils import dispose_db_engines
+from utils.http_utils import close_session
+from utils.msc_utils import get_logger
 
 load_dotenv()
 
@@ -20,11 +25,22 @@ def run_pipeline(entrypoint, is_incremental=True, to_skip=500):
     ui_DB_NAME_PRD = "production"
     ui_TBL_NAME_STG = f"raw_incremental_load_{ui_time_stamp}"
     ui_TBL_NAME_PRD = f"vehicle_data_prd"
+    ui_CHUNK_SIZE = 1000
+    ui_TRANSFORM_CHUNK_SIZE = 10000
+
+    # Listings already in production are skipped without fetching their details page
+    seen_listing_ids = get_listing_ids(DB_NAME=ui_DB_NAME_PRD, TBL_NAME=ui_TBL_NAME_PRD)
 
     # Extract listings from website
-    data = extract(entrypoint, is_incremental=is_incremental, to_skip=to_skip)
+    data = extract_chunks(
+        entrypoint,
+        is_incremental=is_incremental,
+        to_skip=to_skip,
+        chunk_size=ui_CHUNK_SIZE,
+        seen_listing_ids=seen_listing_ids,
+    )
 
-    # Load extracted data to the staging table in PostgreSQL
+    # Load extracted data to the staging table in PostgreSQL as it is scraped
     extract_to_staging(
         DB_NAME=ui_DB_NAME_STG,
         TBL_NAME=ui_TBL_NAME_STG,
@@ -32,12 +48,15 @@ def run_pipeline(entrypoint, is_incremental=True, to_skip=500):
         is_incremental=is_incremental,
     )
 
-    # Transform the data loaded into the staging table
-    data = transform(
-        DB_NAME=ui_DB_NAME_STG, TBL_NAME=ui_TBL_NAME_STG, is_incremental=is_incremental
+    # Transform the data loaded into the staging table, streamed in chunks
+    data = transform_chunks(
+        DB_NAME=ui_DB_NAME_STG,
+        TBL_NAME=ui_TBL_NAME_STG,
+        is_incremental=is_incremental,
+        chunk_size=ui_TRANSFORM_CHUNK_SIZE,
     )
 
-    # Load to production table
+    # Load to production table as it is transformed
     transform_to_prod(
         DB_NAME=ui_DB_NAME_PRD,
         TBL_NAME=ui_TBL_NAME_PRD,
@@ -45,10 +64,35 @@ def run_pipeline(entrypoint, is_incremental=True, to_skip=500):
         is_incremental=is_incremental,
     )
 
+    # The listings are loaded at this point. A failed refresh is logged and retried by
+    # the next run, instead of stopping the scheduler
+    log_console = get_logger("IL_PIPELINE - Refresh - CO", output_to_file=False)
+
+    # Update the valuation model from the listings just loaded
+    try:
+        refresh_model(DB_NAME=ui_DB_NAME_PRD, TBL_NAME=ui_TBL_NAME_PRD)
+    except Exception:
+        log_console.exception("Refreshing the valuation model failed.")
+
+    # Add the listings just loaded to the comparables index
+    try:
+        update_comparables_index()
+    except Exception:
+        log_console.exception("Updating the comparables index failed.")
+
+
+def run_scheduled_pipeline(entrypoint, is_incremental=True, to_skip=500):
+    try:
+        run_pipeline(entrypoint, is_incremental=is_incremental, to_skip=to_skip)
+    finally:
+        # Release the pooled connections instead of holding them idle until the next run
+        dispose_db_engines()
+        close_session()
+
 
 # Schedule the pipeline to run every day at 12:01 AM
 schedule.every().day.at("00:01").do(
-    run_pipeline, entrypoint=entrypoint, is_incremental=True, to_skip=500
+    run_scheduled_pipeline, entrypoint=entrypoint, is_incremental=True, to_skip=500
 )
 
 if __name__ == "__main__":
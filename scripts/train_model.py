@@ -0,0 +1,42 @@
+import argparse
+
+from dotenv import load_dotenv
+
+from features.store import update_feature_store
+from models.comparables import update_comparables_index
+from models.train import train_model
+
+load_dotenv()
+
+
+def run_training(refit_features=False):
+    # Define Static Inputs
+    ui_DB_NAME_PRD = "production"
+    ui_TBL_NAME_PRD = "vehicle_data_prd"
+
+    # Encode the listings loaded since the last run
+    update_feature_store(
+        DB_NAME=ui_DB_NAME_PRD, TBL_NAME=ui_TBL_NAME_PRD, refit=refit_features
+    )
+
+    # Index the listings for the comparables of the predictor
+    update_comparables_index()
+
+    # Cross-validate the grid and export the best model for the predictor
+    bundle, _, _ = train_model()
+
+    print(f"Exported {bundle['params']}: CV MAPE {bundle['cv_mape']:.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Train the valuation model on the production listings."
+    )
+    parser.add_argument(
+        "--refit-features",
+        action="store_true",
+        help="Fit a new version of the feature encoder instead of extending the latest.",
+    )
+    args = parser.parse_args()
+
+    run_training(refit_features=args.refit_features)
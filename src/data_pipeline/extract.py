@@ -1,14 +1,19 @@
 import os
-import time
+import re
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from urllib.parse import urljoin, urlsplit
 
 import pandas as pd
-import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from dotenv import load_dotenv
 
+from data_pipeline.schema import RAW_SCHEMA, arrow_schema, empty_frame, enforce_schema
+from utils.http_utils import REQUEST_STATS, HostRateLimiter, fetch_content
+from utils.io_utils import RAW_DATA_DIR, write_snapshot
 from utils.msc_utils import (
+    SORT_RECENT_SELECTOR,
     customize_logger,
     initialize_web_browser,
     initialize_web_driver,
@@ -18,9 +23,70 @@ from utils.msc_utils import (
 load_dotenv()
 
 
-def extract(entrypoint, is_incremental, to_skip=500):
+def has_any_class(*class_names):
     """
-    Scrapes data from the website and saves it in the staging folder: data/raw_data.
+    Builds a SoupStrainer predicate that matches tags carrying any of `class_names`.
+    """
+
+    class_names = frozenset(class_names)
+
+    def predicate(value):
+        if not value:
+            return False
+        if isinstance(value, str):
+            value = value.split()
+        return not class_names.isdisjoint(value)
+
+    return predicate
+
+
+# Only the nodes read by `extract_listing_info` and `extract_additional_details` are
+# parsed into the soup; everything else on the page is skipped by the parser.
+LISTING_PAGE_STRAINER = SoupStrainer(
+    class_=has_any_class("col-4", "box-no-results-search-v2")
+)
+DETAILS_PAGE_STRAINER = SoupStrainer(
+    class_=has_any_class(
+        "parameter-info",
+        "list-description",
+        "box-accompanied-service",
+        "date-post",
+        "product_detail_des",
+    )
+)
+
+# Text between a tag and the next one, for `escape_carriage_returns`
+TEXT_SEGMENT = re.compile(r">[^<]+")
+TEXT_SEGMENT_BYTES = re.compile(rb">[^<]+")
+
+
+def extract(entrypoint, is_incremental, to_skip=500, **kwargs):
+    """
+    Scrapes data from the website and returns it as a single DataFrame.
+    Accepts the same keyword arguments as `extract_chunks`, except `chunk_size`.
+    """
+
+    chunks = extract_chunks(
+        entrypoint, is_incremental, to_skip=to_skip, chunk_size=None, **kwargs
+    )
+
+    return enforce_schema(pd.concat(chunks, ignore_index=True), RAW_SCHEMA)
+
+
+def extract_chunks(
+    entrypoint,
+    is_incremental,
+    to_skip=500,
+    max_workers=None,
+    rate_limit=None,
+    chunk_size=1000,
+    checkpoint=None,
+    seen_listing_ids=None,
+):
+    """
+    Scrapes data from the website and yields it as DataFrames of at least `chunk_size`
+    rows. Chunks are cut at results page boundaries, so only the rows of the pages not
+    yet yielded are held in memory. At least one (possibly empty) chunk is always yielded.
 
     Args:
         entrypoint (str): The URL of the website to scrape.
@@ -29,6 +95,19 @@ def extract(entrypoint, is_incremental, to_skip=500):
             the scraper to skip a specified number of postings that do not match yesterday's
             date. This is necessary because the website's sorting by recent postings may not
             work correctly, and this ensures that all postings from yesterday are checked.
+        max_workers (int): Number of details pages fetched concurrently. Defaults to the
+            `SCRAPER_MAX_WORKERS` environment variable, or 4.
+        rate_limit (float): Maximum number of requests per second sent to each host.
+            Defaults to the `SCRAPER_RATE_LIMIT` environment variable, or 2.
+        chunk_size (int): Minimum number of rows per chunk. If None, all rows are yielded
+            as one chunk at the end of the run.
+        checkpoint (ScrapeCheckpoint): Optional progress store. Scraping resumes after its
+            last completed page and skips the listings it has already fetched. Every chunk
+            carries its last completed page in `chunk.attrs["last_page"]` so the loader
+            can commit it once the chunk is written.
+        seen_listing_ids (set): Optional listing_ids that are already loaded (e.g. from
+            `get_listing_ids`). Their details pages are not fetched, and scraping stops at
+            the first results page whose listings are all known.
     """
 
     if is_incremental:
@@ -36,18 +115,42 @@ def extract(entrypoint, is_incremental, to_skip=500):
     else:
         log_console = customize_logger(feature="extract", subfeature="full")
 
+    # The request stats logged at the end of the run cover this run only
+    REQUEST_STATS.reset()
+
     log_console.info("Initializing website .....")
-    driver, page_url = initialize_website()
+    page_url = initialize_website()
     log_console.info("Website initialized .....")
 
-    car_data = initialize_df()
+    car_rows = []
+
+    if max_workers is None:
+        max_workers = int(os.getenv("SCRAPER_MAX_WORKERS", 4))
+    if rate_limit is None:
+        rate_limit = float(os.getenv("SCRAPER_RATE_LIMIT", 2))
+    rate_limiter = HostRateLimiter(rate_limit, capacity=max_workers)
 
     page = 0
     car_posting = 0
     skipped_postings = 0
+    yielded_chunks = 0
+    fetched_listing_ids = set()
+    seen_listing_ids = seen_listing_ids or frozenset()
+    if checkpoint:
+        page = checkpoint.last_page()
+        fetched_listing_ids = checkpoint.fetched_listing_ids()
+        if page:
+            log_console.info(
+                f"Resuming after page {page} with {len(fetched_listing_ids)} listings already loaded."
+            )
+
     while True:
         page += 1
-        page_soup = get_page_soup(f"{page_url}/p{page}")
+        page_soup = get_page_soup(
+            get_listings_page_url(page_url, page),
+            rate_limiter,
+            parse_only=LISTING_PAGE_STRAINER,
+        )
 
         # Exit point 2 for the while loop in full pipeline
         if page_soup.find(class_="box-no-results-search-v2"):
@@ -67,15 +170,49 @@ def extract(entrypoint, is_incremental, to_skip=500):
             postings = page_soup.find_all("div", class_="col-4")
 
             # Scrape listing info on the summary page
-            for car in postings:
-                listing_info = extract_listing_info(car)
-                if not listing_info["listing_url"]:
-                    continue
-
-                # Scrape additional info based on the listing url
-                car_details_soup = get_page_soup(
-                    f"{entrypoint}{listing_info['listing_url']}"
+            listings = [extract_listing_info(car) for car in postings]
+
+            # Cards without an id or URL (e.g. ads) are never fetched nor known
+            listings_with_ids = [
+                listing_info
+                for listing_info in listings
+                if listing_info["listing_id"] and listing_info["listing_url"]
+            ]
+
+            # Exit point for the while loop when every listing on the page is known
+            if (
+                seen_listing_ids
+                and listings_with_ids
+                and all(
+                    listing_info["listing_id"] in seen_listing_ids
+                    for listing_info in listings_with_ids
                 )
+            ):
+                log_console.info(f"Successfully scraped {car_posting} car postings.")
+                log_console.info(f"All listings on page {page} are already loaded.")
+                break
+
+            listings_to_fetch = [
+                listing_info
+                for listing_info in listings_with_ids
+                if listing_info["listing_id"] not in fetched_listing_ids
+                and listing_info["listing_id"] not in seen_listing_ids
+            ]
+
+            # Scrape additional info based on the listing urls
+            car_details_soups = fetch_page_soups(
+                [
+                    f"{entrypoint}{listing_info['listing_url']}"
+                    for listing_info in listings_to_fetch
+                ],
+                rate_limiter,
+                max_workers,
+                parse_only=DETAILS_PAGE_STRAINER,
+            )
+
+            for listing_info, car_details_soup in zip(
+                listings_to_fetch, car_details_soups
+            ):
                 additional_info = extract_additional_details(car_details_soup)
 
                 # Condition for incremental pipeline
@@ -87,66 +224,165 @@ def extract(entrypoint, is_incremental, to_skip=500):
                         continue
 
                 listing_info.update(additional_info)
-                new_data = pd.DataFrame([listing_info], columns=car_data.columns)
-                car_data = pd.concat([car_data, new_data], ignore_index=True)
+                car_rows.append(listing_info)
                 car_posting += 1
                 log_console.info(
                     f"Page: {page} | Listing no: {car_posting} | Scraped info from: {listing_info['listing_url']}"
                 )
 
-                time.sleep(0.5)
-
             # Exit point 1 for the while loop in full pipeline
-            if listing_info["listing_title"] == "":
+            if listings and listings[-1]["listing_title"] == "":
                 skipped_postings += 1
 
+            if chunk_size and len(car_rows) >= chunk_size:
+                yield rows_to_chunk(car_rows, last_page=page)
+                yielded_chunks += 1
+                car_rows = []
+
+    log_console.info(f"HTTP requests: {REQUEST_STATS.summary()}")
     log_console.info("Exiting: Extraction process completed successfully!")
 
-    return car_data
+    # The loop exits before scraping the current page
+    if car_rows or not yielded_chunks:
+        yield rows_to_chunk(car_rows, last_page=page - 1)
 
 
-def initialize_website():
-    driver_path = os.getenv("CHROMEDRIVER_PATH")
+def initialize_website(use_browser=None):
+    """
+    Returns the URL of the listings sorted by most recent, which the incremental
+    pipeline relies on to stop at the first page of known listings. The URL is read from
+    `LISTINGS_URL`. Otherwise the first results page at `CHROMEBROWSER_URL` is requested
+    over HTTP, and the URL is read from its "sort by recent" link, so no browser is
+    started.
+
+    Args:
+        use_browser (bool): Clicks "sort by recent" in headless Chrome instead, as the
+            pipeline used to. Defaults to the `USE_BROWSER` environment variable. The
+            driver is closed as soon as the listings are sorted.
+    """
+    listings_url = os.getenv("LISTINGS_URL")
+    if listings_url:
+        return listings_url
+
     page_url = os.getenv("CHROMEBROWSER_URL")
-    driver = initialize_web_driver(driver_path)
-    driver = initialize_web_browser(driver, page_url)
-    sort_listings(driver)
+    if not page_url:
+        raise ValueError(
+            "Set LISTINGS_URL to the listings sorted by most recent, or "
+            "CHROMEBROWSER_URL to the first results page."
+        )
+
+    if use_browser is None:
+        use_browser = os.getenv("USE_BROWSER", "").lower() in ("1", "true")
+
+    if use_browser:
+        driver_path = os.getenv("CHROMEDRIVER_PATH")
+        driver = initialize_web_driver(driver_path)
+        try:
+            driver = initialize_web_browser(driver, page_url)
+            return sort_listings(driver)
+        finally:
+            driver.quit()
+
+    return find_sorted_listings_url(page_url)
+
+
+def find_sorted_listings_url(page_url):
+    """
+    Returns the absolute URL of the "sort by recent" link of the results page.
+    """
+
+    sort_recent = get_page_soup(page_url).select_one(SORT_RECENT_SELECTOR)
+    if sort_recent is None or not sort_recent.get("href"):
+        raise LookupError(
+            f"No 'sort by recent' link found on {page_url}. Set LISTINGS_URL to the "
+            "listings sorted by most recent."
+        )
 
-    return driver, page_url
+    return urljoin(page_url, sort_recent["href"])
+
+
+def get_listings_page_url(listings_url, page):
+    """
+    Returns the URL of a results page, keeping the query string (e.g. the sort order)
+    of the listings URL.
+    """
+
+    parts = urlsplit(listings_url)
+    return parts._replace(path=f"{parts.path.rstrip('/')}/p{page}").geturl()
 
 
 def initialize_df():
-    car_data = pd.DataFrame(
-        {
-            "listing_id": [],
-            "dealer_id": [],
-            "listing_title": [],
-            "listing_price": [],
-            "listing_location": [],
-            "listing_url": [],
-            "detail_date_posted": [],
-            "detail_make": [],
-            "detail_model": [],
-            "detail_year": [],
-            "detail_status": [],
-            "detail_color": [],
-            "detail_transmission": [],
-            "detail_mileage": [],
-            "detail_coding": [],
-            "detail_features": [],
-            "negotiation_and_test_drive": [],
-            "additional_services": [],
-            "complete_listing_description": [],
-            "detail_price": [],
-        }
-    )
+    car_data = empty_frame(RAW_SCHEMA)
 
     return car_data
 
 
-def get_page_soup(url):
-    page_soup = requests.get(url).content
-    return BeautifulSoup(page_soup, "html.parser")
+def rows_to_df(rows):
+    """
+    Builds the DataFrame in one pass from the buffered listing rows, with the columns
+    and dtypes of `RAW_SCHEMA`. Appending to a list and converting once avoids copying
+    the whole frame on every scraped listing.
+    """
+
+    car_data = initialize_df()
+    if not rows:
+        return car_data
+
+    car_data = pd.DataFrame(rows, columns=car_data.columns)
+
+    return enforce_schema(car_data, RAW_SCHEMA)
+
+
+def rows_to_chunk(rows, last_page):
+    car_data = rows_to_df(rows)
+    car_data.attrs["last_page"] = last_page
+
+    return car_data
+
+
+def get_page_soup(url, rate_limiter=None, parse_only=None):
+    page_soup = fetch_content(url, rate_limiter)
+    return parse_page(page_soup, parse_only)
+
+
+def parse_page(markup, parse_only=None):
+    """
+    Parses the page with the backend named in the `HTML_PARSER` environment variable
+    ("html.parser" by default, or "lxml"). `parse_only` restricts the tree to the nodes
+    matched by a SoupStrainer.
+    """
+
+    parser = os.getenv("HTML_PARSER", "html.parser")
+    if parser == "lxml":
+        markup = escape_carriage_returns(markup)
+
+    return BeautifulSoup(markup, parser, parse_only=parse_only)
+
+
+def escape_carriage_returns(markup):
+    """
+    Replaces the carriage returns of the text between tags with character references.
+    lxml turns CRLF line endings into LF while "html.parser" keeps them, and the pages
+    of the website use CRLF, e.g. in the listing locations.
+    """
+
+    if isinstance(markup, bytes):
+        return TEXT_SEGMENT_BYTES.sub(
+            lambda match: match.group().replace(b"\r", b"&#13;"), markup
+        )
+
+    return TEXT_SEGMENT.sub(lambda match: match.group().replace("\r", "&#13;"), markup)
+
+
+def fetch_page_soups(urls, rate_limiter=None, max_workers=1, parse_only=None):
+    """
+    Fetches the pages concurrently and returns their soups in the same order as `urls`.
+    """
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(
+            executor.map(lambda url: get_page_soup(url, rate_limiter, parse_only), urls)
+        )
 
 
 def safe_find(soup, class_name, default=""):
@@ -266,6 +502,23 @@ def extract_additional_details(soup):
     }
 
 
+def save_data(df, load_date=None, part=0):
+    """
+    Saves scraped data as a Parquet snapshot under `data/raw_data`, partitioned by load
+    date. Chunks from `extract_chunks` can be saved as successive parts of the same
+    date. See `utils.io_utils.write_snapshot`.
+    """
+    file_path = write_snapshot(
+        df,
+        RAW_DATA_DIR,
+        load_date=load_date,
+        part=part,
+        schema=arrow_schema(RAW_SCHEMA),
+    )
+
+    return file_path
+
+
 if __name__ == "__main__":
     print("|==============================|")
     print("|           pipeline           |")
@@ -1,20 +1,42 @@
+import io
 import os
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 
 import pandas as pd
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, inspect, text
+from sqlalchemy import create_engine, text
 
-from utils.db_utils import create_db_engine
-from utils.msc_utils import customize_logger
+from data_pipeline.schema import PROCESSED_SCHEMA, RAW_SCHEMA, enforce_schema
+from utils.db_utils import get_db_engine
+from utils.msc_utils import customize_logger, prefetch
 
 load_dotenv()
 
+# Rows sent to the database per COPY or INSERT batch
+LOAD_CHUNK_SIZE = int(os.getenv("LOAD_CHUNK_SIZE", 10_000))
+
+# Columns of the production table stored as TEXT[], with the suffix of their GIN index
+PROD_LIST_COLUMNS = {
+    "detail_features": "features",
+    "additional_services": "services",
+    "negotiation_and_test_drive": "negotiation",
+}
+
 
 def extract_to_staging(
-    DB_NAME: str, TBL_NAME: str, data: pd.DataFrame, is_incremental: bool
+    DB_NAME: str, TBL_NAME: str, data, is_incremental: bool, checkpoint=None
 ):
+    """
+    Loads the extracted data to the staging table. `data` is either a DataFrame or an
+    iterable of DataFrame chunks (e.g. `extract_chunks`). Chunks are produced on a
+    background thread and appended to the table as they arrive, so scraping overlaps
+    with loading and only a couple of chunks are held in memory.
+
+    If a `checkpoint` is given, each chunk is committed to it once written. When the
+    checkpoint already holds progress, the first chunk is appended to the table instead
+    of replacing it.
+    """
     # Load loggers
     if is_incremental:
         log_console = customize_logger(feature="load", subfeature="incremental")
@@ -25,7 +47,7 @@ def extract_to_staging(
 
     log_console.info(f"Initiating: Loading process to {DB_NAME.upper()} DATABASE.")
     time_stamp = str(datetime.now().date()).replace("-", "")
-    engine = create_db_engine(DB_NAME)
+    engine = get_db_engine(DB_NAME)
 
     exists = check_table_exists(engine, TBL_NAME)
     if not exists:
@@ -34,7 +56,22 @@ def extract_to_staging(
             f"Staging Database Table {TBL_NAME.upper()} has been created successfully."
         )
 
-    load_to_staging_table(engine, data, TBL_NAME)
+    if isinstance(data, pd.DataFrame):
+        chunks = [data]
+    else:
+        chunks = prefetch(data)
+
+    is_resumed = bool(checkpoint and checkpoint.last_page())
+
+    loaded_rows = 0
+    for i, chunk in enumerate(chunks):
+        chunk = enforce_schema(chunk, RAW_SCHEMA)
+        if_exists = "replace" if i == 0 and not is_resumed else "append"
+        load_to_staging_table(engine, chunk, TBL_NAME, if_exists=if_exists)
+        if checkpoint:
+            checkpoint.commit(chunk)
+        loaded_rows += len(chunk)
+        log_console.info(f"Loaded {loaded_rows} rows to {TBL_NAME.upper()} TABLE.")
 
     if is_incremental:
         log_console.info(
@@ -46,9 +83,16 @@ def extract_to_staging(
         )
 
 
-def transform_to_prod(
-    DB_NAME: str, TBL_NAME: str, data: pd.DataFrame, is_incremental: bool
-):
+def transform_to_prod(DB_NAME: str, TBL_NAME: str, data, is_incremental: bool):
+    """
+    Loads the transformed data to the production table. `data` is either a DataFrame or
+    an iterable of DataFrame chunks (e.g. `transform_chunks`), which are produced on a
+    background thread and upserted as they arrive.
+
+    Incremental loads upsert into the current snapshot. Full loads are written to a new
+    partition, which then replaces the current snapshot in a single transaction; the
+    previous snapshot is detached and kept as an archive.
+    """
     # Load loggers
     if is_incremental:
         log_console = customize_logger(feature="load", subfeature="incremental")
@@ -58,45 +102,86 @@ def transform_to_prod(
     # Entry point for the transform to production function
 
     log_console.info(f"Initiating: Loading process to {DB_NAME.upper()} DATABASE.")
-    time_stamp = str(datetime.now().date()).replace("-", "")
-    engine = create_db_engine(DB_NAME)
+    # One date for every partition bound, row and default of this load, rather than the
+    # database's CURRENT_DATE, which can differ from it around midnight
+    load_date = datetime.now().date()
+    time_stamp = str(load_date).replace("-", "")
+    engine = get_db_engine(DB_NAME)
 
     exists = check_table_exists(engine, TBL_NAME)
+    current_partition = f"{TBL_NAME}_current"
 
     if not exists:
         create_prod_table(engine, TBL_NAME)
         log_console.info(
             f"Production Database Table {TBL_NAME.upper()} has been created successfully."
         )
-
-    if is_incremental:
-        load_to_prod_table(engine, data, TBL_NAME)
+    elif migrate_prod_table(engine, TBL_NAME, load_date):
         log_console.info(
-            f"Incremental data for {time_stamp} has been loaded to {TBL_NAME.upper()} TABLE in {DB_NAME.upper()} DATABASE successfully!"
+            f"Production Database Table {TBL_NAME.upper()} has been converted to a partitioned table."
         )
 
+    if is_incremental:
+        # Upsert into the snapshot currently attached to the table
+        if not check_table_exists(engine, current_partition):
+            create_prod_partition(engine, TBL_NAME, current_partition, load_date)
+            create_prod_indexes(engine, current_partition)
+            attach_prod_partition(engine, TBL_NAME, current_partition, load_date)
+        snapshot_date = get_snapshot_date(engine, TBL_NAME, load_date)
+        target_TBL_NAME = TBL_NAME
     else:
-        if exists:
-            archive_prod_table(engine, TBL_NAME)
-            log_console.info(
-                f"Production Database Table {TBL_NAME.upper()} in {DB_NAME.upper()} DATABASE has been archived successfully!"
-            )
+        # Build the new snapshot on the side, readers keep using the current one
+        snapshot_date = load_date
+        target_TBL_NAME = f"{TBL_NAME}_next"
+        create_prod_partition(engine, TBL_NAME, target_TBL_NAME, snapshot_date)
 
-            create_prod_table(engine, TBL_NAME)
+    if isinstance(data, pd.DataFrame):
+        chunks = [data]
+    else:
+        chunks = prefetch(data)
+
+    loaded_rows = 0
+    for chunk in chunks:
+        chunk = enforce_schema(chunk, PROCESSED_SCHEMA)
+        loaded_rows += load_to_prod_table(engine, chunk, target_TBL_NAME, snapshot_date)
+        log_console.info(f"Loaded {loaded_rows} rows to {TBL_NAME.upper()} TABLE.")
+
+    if not is_incremental:
+        # Indexes are built once the rows are in, and are reused when it is attached
+        create_prod_indexes(engine, target_TBL_NAME)
+        if swap_prod_partition(engine, TBL_NAME, target_TBL_NAME, snapshot_date):
             log_console.info(
-                f"Production Database Table {TBL_NAME.upper()} has been created successfully."
+                f"Production Database Table {TBL_NAME.upper()} in {DB_NAME.upper()} DATABASE has been archived successfully!"
             )
 
-        load_to_prod_table(engine, data, TBL_NAME)
+    if is_incremental:
+        log_console.info(
+            f"Incremental data for {time_stamp} has been loaded to {TBL_NAME.upper()} TABLE in {DB_NAME.upper()} DATABASE successfully!"
+        )
+    else:
         log_console.info(
             f"Exiting: Full data as of {time_stamp} has been loaded to {TBL_NAME.upper()} TABLE in {DB_NAME.upper()} DATABASE successfully!"
         )
 
 
-def check_table_exists(engine, TBL_NAME):
-    inspector = inspect(engine)
+def get_listing_ids(DB_NAME: str, TBL_NAME: str):
+    """
+    Returns the listing_ids already loaded to the table as a frozenset, or an empty
+    frozenset if the table does not exist yet.
+    """
+    engine = get_db_engine(DB_NAME)
+
+    if not check_table_exists(engine, TBL_NAME):
+        return frozenset()
 
-    exists = inspector.has_table(TBL_NAME, schema="public")
+    with engine.connect() as connection:
+        result = connection.execute(text(f"SELECT DISTINCT listing_id FROM {TBL_NAME}"))
+        return frozenset(listing_id for (listing_id,) in result)
+
+
+def check_table_exists(engine, TBL_NAME):
+    with engine.connect() as connection:
+        exists = engine.dialect.has_table(connection, TBL_NAME, schema="public")
 
     return exists
 
@@ -134,9 +219,26 @@ def create_staging_table(engine, TBL_NAME):
 
 
 def create_prod_table(engine, TBL_NAME):
+    """
+    Creates the production table, range-partitioned on `snapshot_date`, the date of the
+    full load each row belongs to. Only the current snapshot is attached; archived
+    snapshots are detached partitions that keep their data and indexes.
+    """
+    query = build_prod_table_query(TBL_NAME)
+
+    with engine.connect() as connection:
+        connection.execute(text(query))
+        connection.commit()
+
+    create_prod_indexes(engine, TBL_NAME)
+
+    # print(f"Production Table '{TBL_NAME}' created successfully.")
+
+
+def build_prod_table_query(TBL_NAME):
     query = f"""
     CREATE TABLE {TBL_NAME} (
-        listing_id VARCHAR(10),
+        listing_id VARCHAR(10) NOT NULL,
         dealer_id VARCHAR(6),
         listing_title VARCHAR(500),
         listing_location VARCHAR(50),
@@ -144,53 +246,404 @@ def create_prod_table(engine, TBL_NAME):
         detail_date_posted DATE,
         detail_make VARCHAR(50),
         detail_model VARCHAR(50),
-        detail_year VARCHAR(4),
+        detail_year SMALLINT,
         detail_status VARCHAR(10),
         detail_color VARCHAR(20),
         detail_transmission VARCHAR(50),
         detail_mileage INT,
         detail_coding VARCHAR(20),
-        detail_features VARCHAR(1000),
+        detail_features TEXT[],
         detail_price INT,
-        additional_services VARCHAR(1000),
-        negotiation_and_test_drive VARCHAR(1000),
-        complete_listing_description VARCHAR(1000000)
-        
+        additional_services TEXT[],
+        negotiation_and_test_drive TEXT[],
+        complete_listing_description VARCHAR(1000000),
+        snapshot_date DATE NOT NULL,
+        PRIMARY KEY (listing_id, snapshot_date)
+    ) PARTITION BY RANGE (snapshot_date)
+    """
+
+    return query
+
+
+def build_prod_types_query(TBL_NAME):
+    """
+    Converts the year and list columns of a production table created before they were
+    typed. The list columns already hold PostgreSQL array literals.
+    """
+    list_columns = ",\n".join(
+        f"ALTER COLUMN {column} TYPE TEXT[] USING CAST({column} AS TEXT[])"
+        for column in PROD_LIST_COLUMNS
     )
+
+    query = f"""
+    ALTER TABLE {TBL_NAME}
+    ALTER COLUMN detail_year TYPE SMALLINT
+        USING CAST(NULLIF(btrim(detail_year), '') AS SMALLINT),
+    {list_columns}
     """
 
-    with engine.connect() as connection:
-        connection.execute(text(query))
-        connection.commit()
+    return query
 
-    # print(f"Production Table '{TBL_NAME}' created successfully.")
 
+def create_prod_indexes(engine, TBL_NAME):
+    """
+    Indexes the production table (or one of its partitions) for comparable-listing
+    lookups: a composite index on make, model, year and mileage, and GIN indexes on the
+    list columns for containment queries such as `detail_features @> ARRAY['ABS']`.
+    Created on the partitioned table, the indexes cascade to its partitions.
+    """
+    queries = [
+        f"""
+        CREATE INDEX IF NOT EXISTS {TBL_NAME}_make_model_year_idx
+        ON {TBL_NAME} (detail_make, detail_model, detail_year, detail_mileage)
+        """
+    ]
+    for column, suffix in PROD_LIST_COLUMNS.items():
+        queries.append(
+            f"""
+            CREATE INDEX IF NOT EXISTS {TBL_NAME}_{suffix}_idx
+            ON {TBL_NAME} USING GIN ({column})
+            """
+        )
+
+    with engine.begin() as connection:
+        for query in queries:
+            connection.execute(text(query))
 
-def archive_prod_table(engine, TBL_NAME):
-    now = datetime.now().date()
-    yesterday = str(now - timedelta(days=1)).replace("-", "_")
 
-    old_TBL_NAME = TBL_NAME
-    new_TBL_NAME = f"{TBL_NAME}_as_of_{yesterday}"
+def rename_table(connection, OLD_TBL_NAME, NEW_TBL_NAME):
+    """
+    Renames a table along with the indexes named after it, since index names have to be
+    unique and would otherwise clash with those of the next table given the old name.
+    """
+    index_query = """
+    SELECT indexname FROM pg_indexes
+    WHERE schemaname = 'public' AND tablename = :table_name
+    """
 
-    query = f"ALTER TABLE {old_TBL_NAME} RENAME TO {new_TBL_NAME};"
+    # Read every name before the DDL below runs on the same connection
+    index_names = list(
+        connection.execute(text(index_query), {"table_name": OLD_TBL_NAME}).scalars()
+    )
+    connection.execute(text(f"ALTER TABLE {OLD_TBL_NAME} RENAME TO {NEW_TBL_NAME}"))
+    for index_name in index_names:
+        if index_name.startswith(f"{OLD_TBL_NAME}_"):
+            new_index_name = NEW_TBL_NAME + index_name[len(OLD_TBL_NAME) :]
+            connection.execute(
+                text(f"ALTER INDEX {index_name} RENAME TO {new_index_name}")
+            )
+
+
+def create_prod_partition(engine, TBL_NAME, PARTITION_NAME, snapshot_date):
+    """
+    Creates a standalone table shaped like a partition of the production table, ready
+    to be loaded and then attached for `snapshot_date` onwards. A leftover table from
+    an interrupted load is replaced. Its CHECK constraint matches the partition bound,
+    so attaching it does not have to scan the rows.
+    """
+    snapshot_date = str(pd.Timestamp(snapshot_date).date())
+
+    queries = [
+        f"DROP TABLE IF EXISTS {PARTITION_NAME}",
+        f"CREATE TABLE {PARTITION_NAME} (LIKE {TBL_NAME} INCLUDING DEFAULTS)",
+        f"ALTER TABLE {PARTITION_NAME} ADD PRIMARY KEY (listing_id, snapshot_date)",
+        f"""
+        ALTER TABLE {PARTITION_NAME} ADD CONSTRAINT {PARTITION_NAME}_snapshot_check
+        CHECK (snapshot_date >= DATE '{snapshot_date}')
+        """,
+    ]
+
+    with engine.begin() as connection:
+        for query in queries:
+            connection.execute(text(query))
 
-    with engine.connect() as connection:
-        connection.execute(text(query))
-        connection.commit()
 
-    # print(f"Production data as of {yesterday} has been archived successfully!")
+def attach_prod_partition(engine, TBL_NAME, PARTITION_NAME, snapshot_date):
+    with engine.begin() as connection:
+        attach_partition(connection, TBL_NAME, PARTITION_NAME, snapshot_date)
 
 
-def load_to_staging_table(engine, data, TBL_NAME):
+def attach_partition(connection, TBL_NAME, PARTITION_NAME, snapshot_date):
+    snapshot_date = str(pd.Timestamp(snapshot_date).date())
+
+    connection.execute(
+        text(
+            f"""
+            ALTER TABLE {TBL_NAME} ATTACH PARTITION {PARTITION_NAME}
+            FOR VALUES FROM (DATE '{snapshot_date}') TO (MAXVALUE)
+            """
+        )
+    )
+    connection.execute(
+        text(
+            f"ALTER TABLE {PARTITION_NAME} DROP CONSTRAINT IF EXISTS {PARTITION_NAME}_snapshot_check"
+        )
+    )
+
+
+def swap_prod_partition(engine, TBL_NAME, PARTITION_NAME, snapshot_date):
+    """
+    Replaces the current snapshot of the production table with the freshly loaded
+    `PARTITION_NAME` in a single transaction, so readers of the table see either the
+    old or the new snapshot and never a missing table. The previous snapshot is
+    detached and kept, with its indexes, as `<TBL_NAME>_as_of_<yesterday>`, the day
+    before `snapshot_date`. Returns False if there was no snapshot to archive.
+    """
+    yesterday = pd.Timestamp(snapshot_date).date() - timedelta(days=1)
+    yesterday = str(yesterday).replace("-", "_")
+
+    current_TBL_NAME = f"{TBL_NAME}_current"
+    archive_TBL_NAME = f"{TBL_NAME}_as_of_{yesterday}"
+
+    with engine.begin() as connection:
+        archived = connection.execute(
+            text("SELECT to_regclass(:table_name) IS NOT NULL"),
+            {"table_name": current_TBL_NAME},
+        ).scalar()
+
+        if archived:
+            connection.execute(
+                text(f"ALTER TABLE {TBL_NAME} DETACH PARTITION {current_TBL_NAME}")
+            )
+            rename_table(connection, current_TBL_NAME, archive_TBL_NAME)
+
+        rename_table(connection, PARTITION_NAME, current_TBL_NAME)
+        connection.execute(
+            text(
+                f"""
+                ALTER TABLE {current_TBL_NAME} RENAME CONSTRAINT {PARTITION_NAME}_snapshot_check
+                TO {current_TBL_NAME}_snapshot_check
+                """
+            )
+        )
+
+        attach_partition(connection, TBL_NAME, current_TBL_NAME, snapshot_date)
+
+    return archived
+
+
+def get_snapshot_date(engine, TBL_NAME, load_date):
+    """
+    Returns the snapshot date of the rows currently in the production table, or
+    `load_date` if it is empty.
+    """
+    query = f"SELECT COALESCE(MAX(snapshot_date), :load_date) FROM {TBL_NAME}"
+
+    with engine.connect() as connection:
+        return connection.execute(
+            text(query), {"load_date": pd.Timestamp(load_date).date()}
+        ).scalar()
+
+
+def load_to_staging_table(engine, data, TBL_NAME, if_exists="replace"):
     time_stamp = str(datetime.now().date()).replace("-", "")
-    data.to_sql(TBL_NAME, engine, if_exists="replace", index=False)
+    data.to_sql(
+        TBL_NAME,
+        engine,
+        if_exists=if_exists,
+        index=False,
+        method=get_insert_method(),
+        chunksize=LOAD_CHUNK_SIZE,
+    )
 
     # print(f"Incremental data for {time_stamp} has been loaded successfully!")
 
 
-def load_to_prod_table(engine, data, TBL_NAME):
+def load_to_prod_table(engine, data, TBL_NAME, snapshot_date):
+    """
+    Upserts the data into the `snapshot_date` snapshot of the production table (or into
+    a partition of it) on `listing_id`. The rows are bulk
+    loaded into a temporary table, then merged with `INSERT ... ON CONFLICT DO UPDATE`
+    in the same transaction, so a failed or repeated load never duplicates listings.
+    When a listing appears more than once in `data`, its most recently posted row wins.
+    Listings whose values did not change are left untouched, and rows without a
+    `listing_id` are dropped. Returns the number of rows loaded.
+    """
     time_stamp = str(datetime.now().date()).replace("-", "")
-    data.to_sql(TBL_NAME, engine, if_exists="append", index=False)
+    temp_TBL_NAME = f"{TBL_NAME}_upsert"
+
+    # The temporary table copies the NOT NULL of the key, so listings without an id
+    # would fail the whole load
+    data = data[data["listing_id"].notna()]
+    data = data.assign(snapshot_date=pd.Timestamp(snapshot_date).date())
+
+    columns = list(data.columns)
+    column_list = ", ".join(columns)
+    key_columns = ["listing_id", "snapshot_date"]
+    updated_columns = [column for column in columns if column not in key_columns]
+    set_list = ", ".join(f"{column} = EXCLUDED.{column}" for column in updated_columns)
+    current_values = ", ".join(f"{TBL_NAME}.{column}" for column in updated_columns)
+    new_values = ", ".join(f"EXCLUDED.{column}" for column in updated_columns)
+
+    query = f"""
+    INSERT INTO {TBL_NAME} ({column_list})
+    SELECT DISTINCT ON (listing_id) {column_list}
+    FROM {temp_TBL_NAME}
+    ORDER BY listing_id, detail_date_posted DESC NULLS LAST
+    ON CONFLICT (listing_id, snapshot_date) DO UPDATE SET {set_list}
+    WHERE ({current_values}) IS DISTINCT FROM ({new_values})
+    """
+
+    with engine.begin() as connection:
+        connection.execute(
+            text(f"CREATE TEMP TABLE {temp_TBL_NAME} (LIKE {TBL_NAME}) ON COMMIT DROP")
+        )
+        data.to_sql(
+            temp_TBL_NAME,
+            connection,
+            if_exists="append",
+            index=False,
+            method=get_insert_method(),
+            chunksize=LOAD_CHUNK_SIZE,
+        )
+        connection.execute(text(query))
 
     # print(f"Incremental data for {time_stamp} has been loaded successfully!")
+
+    return len(data)
+
+
+def migrate_prod_table(engine, TBL_NAME, snapshot_date):
+    """
+    Brings a production table created by an earlier version of the pipeline up to date.
+    A table created before partitioning becomes the current snapshot of a partitioned
+    table, dated `snapshot_date`; rows without a listing_id are removed and duplicated
+    listings are reduced to their most recently posted (then most recently loaded) row
+    first. Untyped year and list columns are converted and missing indexes are created.
+    Returns False if the table was already up to date.
+    """
+    current_TBL_NAME = f"{TBL_NAME}_current"
+    snapshot_date = str(pd.Timestamp(snapshot_date).date())
+
+    kind_query = (
+        "SELECT relkind FROM pg_class WHERE oid = CAST(:table_name AS regclass)"
+    )
+    year_type_query = """
+    SELECT data_type FROM information_schema.columns
+    WHERE table_schema = 'public' AND table_name = :table_name
+    AND column_name = 'detail_year'
+    """
+    dedupe_query = f"""
+    DELETE FROM {current_TBL_NAME}
+    WHERE listing_id IS NULL
+    OR ctid IN (
+        SELECT ctid FROM (
+            SELECT ctid, ROW_NUMBER() OVER (
+                PARTITION BY listing_id
+                ORDER BY detail_date_posted DESC NULLS LAST, ctid DESC
+            ) AS row_number
+            FROM {current_TBL_NAME}
+        ) AS ranked
+        WHERE row_number > 1
+    )
+    """
+    queries = [
+        f"ALTER TABLE {TBL_NAME} RENAME TO {current_TBL_NAME}",
+        f"ALTER TABLE {current_TBL_NAME} DROP CONSTRAINT IF EXISTS {TBL_NAME}_pkey",
+        dedupe_query,
+        f"""
+        ALTER TABLE {current_TBL_NAME}
+        ADD COLUMN snapshot_date DATE NOT NULL DEFAULT DATE '{snapshot_date}'
+        """,
+        f"ALTER TABLE {current_TBL_NAME} ALTER COLUMN snapshot_date DROP DEFAULT",
+        f"ALTER TABLE {current_TBL_NAME} ALTER COLUMN listing_id SET NOT NULL",
+        f"""
+        ALTER TABLE {current_TBL_NAME} ADD CONSTRAINT {current_TBL_NAME}_pkey
+        PRIMARY KEY (listing_id, snapshot_date)
+        """,
+    ]
+
+    with engine.begin() as connection:
+        kind = connection.execute(text(kind_query), {"table_name": TBL_NAME}).scalar()
+        year_type = connection.execute(
+            text(year_type_query), {"table_name": TBL_NAME}
+        ).scalar()
+        if kind == "p" and year_type == "smallint":
+            return False
+
+        if kind == "p":
+            connection.execute(text(build_prod_types_query(TBL_NAME)))
+        else:
+            for query in queries:
+                connection.execute(text(query))
+            if year_type != "smallint":
+                connection.execute(text(build_prod_types_query(current_TBL_NAME)))
+            connection.execute(text(build_prod_table_query(TBL_NAME)))
+            attach_partition(connection, TBL_NAME, current_TBL_NAME, snapshot_date)
+
+    create_prod_indexes(engine, current_TBL_NAME)
+    create_prod_indexes(engine, TBL_NAME)
+
+    return True
+
+
+def get_insert_method():
+    """
+    Returns the `to_sql` insertion method selected by the `LOAD_METHOD` environment
+    variable: "copy" (default) streams the rows with COPY FROM STDIN, "multi" falls back
+    to batched multi-row INSERT statements.
+    """
+    method = os.getenv("LOAD_METHOD", "copy")
+
+    if method == "copy":
+        return copy_insert
+    if method == "multi":
+        return "multi"
+
+    raise ValueError(f"Unknown LOAD_METHOD: {method}. Expected 'copy' or 'multi'.")
+
+
+def copy_insert(table, conn, keys, data_iter):
+    """
+    `to_sql` insertion method that streams a chunk of rows through PostgreSQL
+    `COPY FROM STDIN` from an in-memory CSV buffer instead of row-by-row INSERTs.
+    """
+    buffer = io.StringIO()
+    buffer.writelines(
+        ",".join(format_copy_value(value) for value in row) + "\n" for row in data_iter
+    )
+    buffer.seek(0)
+
+    columns = ", ".join(f'"{key}"' for key in keys)
+    if table.schema:
+        table_name = f'"{table.schema}"."{table.name}"'
+    else:
+        table_name = f'"{table.name}"'
+
+    with conn.connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {table_name} ({columns}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+        return cursor.rowcount
+
+
+def format_copy_value(value):
+    """
+    Formats a value as a COPY CSV field. NULL is the only unquoted (empty) field, so empty
+    strings survive the round trip. Lists are written as PostgreSQL array literals, the
+    same text the INSERT path stores for them.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, (list, tuple)):
+        value = "{" + ",".join(format_array_item(item) for item in value) + "}"
+
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def format_array_item(item):
+    if item is None:
+        return "NULL"
+
+    item = str(item)
+    if (
+        item == ""
+        or item.upper() == "NULL"
+        or any(char in item for char in '{}",\\')
+        or any(char.isspace() for char in item)
+    ):
+        item = item.replace("\\", "\\\\").replace('"', '\\"')
+        return f'"{item}"'
+
+    return item
@@ -0,0 +1,114 @@
+import pandas as pd
+import pyarrow as pa
+
+# Listings share a few hundred dealers, makes, models, colors and locations, so these
+# columns are stored as categoricals: one small integer code per row instead of one
+# Python string. Free text, URLs, ids and lists stay `object`.
+
+# Columns of the scraped listings, as loaded to the staging table
+RAW_SCHEMA = {
+    "listing_id": "object",
+    "dealer_id": "category",
+    "listing_title": "object",
+    "listing_price": "object",
+    "listing_location": "category",
+    "listing_url": "object",
+    "detail_date_posted": "category",
+    "detail_make": "category",
+    "detail_model": "category",
+    "detail_year": "category",
+    "detail_status": "category",
+    "detail_color": "category",
+    "detail_transmission": "category",
+    "detail_mileage": "object",
+    "detail_coding": "category",
+    "detail_features": "object",
+    "negotiation_and_test_drive": "object",
+    "additional_services": "object",
+    "complete_listing_description": "object",
+    "detail_price": "object",
+}
+
+# Columns of the transformed listings, as loaded to the production table
+PROCESSED_SCHEMA = {
+    "listing_id": "object",
+    "dealer_id": "category",
+    "listing_title": "object",
+    "listing_location": "category",
+    "listing_url": "object",
+    "detail_date_posted": "datetime64[ns]",
+    "detail_make": "category",
+    "detail_model": "category",
+    "detail_year": "Int16",
+    "detail_status": "category",
+    "detail_color": "category",
+    "detail_transmission": "category",
+    "detail_mileage": "Int32",
+    "detail_coding": "category",
+    "detail_features": "object",
+    "negotiation_and_test_drive": "object",
+    "additional_services": "object",
+    "complete_listing_description": "object",
+    "detail_price": "Int32",
+}
+
+
+# `object` columns holding lists of strings rather than strings
+LIST_COLUMNS = ["detail_features", "negotiation_and_test_drive", "additional_services"]
+
+
+def arrow_schema(schema: dict, columns=None):
+    """
+    Returns the Arrow schema of the Parquet files of `schema`, restricted to `columns`.
+    Arrow would otherwise infer each file's types from its own rows, so a file whose
+    categorical or list column is entirely null gets a `dictionary<double>` or `null`
+    column, which later fails to be read together with the other files.
+    """
+    fields = []
+    for col in columns or schema:
+        dtype = schema[col]
+        if dtype == "category":
+            arrow_type = pa.dictionary(pa.int32(), pa.string())
+        elif dtype == "object":
+            arrow_type = pa.list_(pa.string()) if col in LIST_COLUMNS else pa.string()
+        else:
+            dtype = pd.api.types.pandas_dtype(dtype)
+            arrow_type = pa.from_numpy_dtype(getattr(dtype, "numpy_dtype", dtype))
+        fields.append(pa.field(col, arrow_type))
+
+    return pa.schema(fields)
+
+
+def empty_frame(schema: dict):
+    """
+    Returns an empty DataFrame with the columns and dtypes of `schema`.
+    """
+    return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in schema.items()})
+
+
+def enforce_schema(df: pd.DataFrame, schema: dict):
+    """
+    Casts `df` to the dtypes of `schema` and orders its columns like the schema. Used at
+    the boundaries between stages, so a missing or unexpected column fails there
+    instead of in the database. Also used on concatenated chunks: each chunk has its
+    own categories, and `pd.concat` widens mismatched categoricals back to object.
+
+    Raises:
+        ValueError: If the columns of `df` differ from those of `schema`.
+    """
+    missing = [col for col in schema if col not in df.columns]
+    unexpected = [col for col in df.columns if col not in schema]
+    if missing or unexpected:
+        raise ValueError(
+            f"Columns do not match the schema. Missing: {missing}. "
+            f"Unexpected: {unexpected}."
+        )
+
+    df = df[list(schema)]
+    mismatched = {
+        col: dtype for col, dtype in schema.items() if str(df[col].dtype) != dtype
+    }
+    if mismatched:
+        df = df.astype(mismatched)
+
+    return df
@@ -1,20 +1,63 @@
 import ast
+import multiprocessing
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import repeat
 
 import pandas as pd
 from cleantext import clean
 from dotenv import load_dotenv
 
-from utils.db_utils import create_db_engine, get_db_creds
+from data_pipeline.schema import PROCESSED_SCHEMA, arrow_schema, enforce_schema
+from utils.db_utils import get_db_creds, get_db_engine
+from utils.io_utils import PROCESSED_DATA_DIR, write_snapshot
 from utils.msc_utils import customize_logger, get_logger
 
 load_dotenv()
 
+# Number of cleaned listing titles kept in memory between calls
+TITLE_CACHE_SIZE = int(os.getenv("TITLE_CACHE_SIZE", 100_000))
 
-def transform(DB_NAME, TBL_NAME: str, is_incremental: bool):
+
+def transform(DB_NAME, TBL_NAME: str, is_incremental: bool, in_database=None):
+    """
+    Reads the staging table and returns it cleaned for the production table as a
+    single DataFrame. Accepts the same arguments as `transform_chunks`, except
+    `chunk_size`.
+    """
+
+    chunks = transform_chunks(
+        DB_NAME, TBL_NAME, is_incremental, in_database=in_database, chunk_size=None
+    )
+
+    return enforce_schema(pd.concat(chunks, ignore_index=True), PROCESSED_SCHEMA)
+
+
+def transform_chunks(
+    DB_NAME,
+    TBL_NAME: str,
+    is_incremental: bool,
+    in_database=None,
+    chunk_size=10_000,
+):
+    """
+    Reads the staging table through a server-side cursor and yields it cleaned for the
+    production table in chunks of `chunk_size` rows, so memory use is bounded by the
+    chunk size rather than the size of the table.
+
+    Args:
+        DB_NAME (str): Database holding the staging table.
+        TBL_NAME (str): Name of the staging table.
+        is_incremental (bool): Selects the incremental or full-load loggers.
+        in_database (bool): Whether the location, date posted, mileage and price columns
+            are cleaned by the staging database in the SELECT itself, so only the text
+            columns are cleaned in Python. Defaults to `TRANSFORM_IN_DATABASE`, or False.
+        chunk_size (int): Rows per yielded chunk. None reads the whole table at once.
+    """
     # Load loggers
     if is_incremental:
         log_console = customize_logger(
@@ -29,26 +72,64 @@ def transform(DB_NAME, TBL_NAME: str, is_incremental: bool):
 
     log_console.info("Initiating: Transformation process.")
 
-    engine = create_db_engine(DB_NAME)
-    query = f"SELECT * FROM {TBL_NAME};"
-    data = pd.read_sql(query, engine)
+    if in_database is None:
+        in_database = os.getenv("TRANSFORM_IN_DATABASE", "").lower() in ("1", "true")
+
+    if in_database:
+        query = build_transform_query(TBL_NAME)
+        parse_dates = ["detail_date_posted"]
+    else:
+        query = f"SELECT * FROM {TBL_NAME};"
+        parse_dates = None
 
     # Load the list of words to be removed from the listing title from the `.env` file.
-    words_to_remove = os.getenv("WORDS_TO_REMOVE").split(",")
+    words_to_remove = frozenset(os.getenv("WORDS_TO_REMOVE").split(","))
+    n_jobs = int(os.getenv("TRANSFORM_N_JOBS", 1))
+
+    engine = get_db_engine(DB_NAME)
+    with engine.connect().execution_options(stream_results=True) as connection:
+        chunks = pd.read_sql(
+            query, connection, parse_dates=parse_dates, chunksize=chunk_size
+        )
+        if chunk_size is None:
+            chunks = [chunks]
+
+        transformed_rows = 0
+        for data in chunks:
+            data = transform_data(data, words_to_remove, n_jobs, in_database)
+            transformed_rows += len(data)
+            if chunk_size is not None:
+                log_console.info(f"Transformed {transformed_rows} rows.")
 
+            yield data
+
+    log_console.info("Exiting: Transformation process completed successfully!")
+
+
+def transform_data(
+    data: pd.DataFrame, words_to_remove: frozenset, n_jobs=1, in_database=False
+):
+    """
+    Runs the transformation steps on rows read from the staging table. With
+    `in_database`, the rows come from `build_transform_query` and the steps it already
+    applied are skipped.
+    """
     # Entry point for transformation
-    data = transform_listing_title(data, "listing_title", words_to_remove)
+    data = transform_listing_title(data, "listing_title", words_to_remove, n_jobs)
+
+    if not in_database:
+        data = transform_listing_location(data, "listing_location")
 
-    data = transform_listing_location(data, "listing_location")
+        pattern = r"Posted on "
+        data = transform_date_posted(data, "detail_date_posted", pattern)
 
-    pattern = r"Posted on "
-    data = transform_date_posted(data, "detail_date_posted", pattern)
+        pattern = r"km|,"
+        data = transform_mileage(data, "detail_mileage", pattern)
 
-    pattern = r"km|,"
-    data = transform_mileage(data, "detail_mileage", pattern)
+        pattern = r"₱ |,"
+        data = transform_price(data, "detail_price", pattern)
 
-    pattern = r"₱ |,"
-    data = transform_price(data, "detail_price", pattern)
+    data = transform_year(data, "detail_year")
 
     pattern = r"[\r\n\t]+|\s{2,}"
     data = transform_complete_desc(data, "complete_listing_description", pattern)
@@ -57,80 +138,199 @@ def transform(DB_NAME, TBL_NAME: str, is_incremental: bool):
     list_cols = ["negotiation_and_test_drive", "detail_features", "additional_services"]
     data = transform_list_cols(data, list_cols, pattern)
 
-    drop_cols = ["listing_price"]
-    data = drop_columns(data, drop_cols)
-
-    log_console.info("Exiting: Transformation process completed successfully!")
-
-    return data
-
-
-def remove_words(text: str, words: list):
+    if not in_database:
+        drop_cols = ["listing_price"]
+        data = drop_columns(data, drop_cols)
+
+    return enforce_schema(data, PROCESSED_SCHEMA)
+
+
+def build_transform_query(TBL_NAME: str):
+    """
+    Builds the SELECT used when the transform is pushed down to the staging database.
+    The location, date posted, mileage and price expressions mirror
+    `transform_listing_location`, `transform_date_posted`, `transform_mileage` and
+    `transform_price`, and `listing_price` is never read. An empty date posted is NULL,
+    like the NaT of `pd.to_datetime`, where `to_date` would return the year 1 BC.
+    """
+    # Every character `str.strip` removes, as PostgreSQL's `\s` is ASCII-only
+    space = r"[\t-\r\u001c-\u0020\u0085\u00a0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000]"
+    mileage = r"regexp_replace(detail_mileage, 'km|,', '', 'g')"
+
+    query = f"""
+    SELECT
+        listing_id,
+        dealer_id,
+        listing_title,
+        regexp_replace(listing_location, '^{space}+|{space}+$', '', 'g') AS listing_location,
+        listing_url,
+        to_date(
+            NULLIF(regexp_replace(detail_date_posted, 'Posted on ', '', 'g'), ''),
+            'DD/MM/YYYY'
+        ) AS detail_date_posted,
+        detail_make,
+        detail_model,
+        detail_year,
+        detail_status,
+        detail_color,
+        detail_transmission,
+        CASE
+            WHEN detail_mileage IS NULL THEN -1
+            WHEN {mileage} = 'N/A' THEN -2
+            ELSE CAST({mileage} AS BIGINT)
+        END AS detail_mileage,
+        detail_coding,
+        detail_features,
+        negotiation_and_test_drive,
+        additional_services,
+        complete_listing_description,
+        CAST(regexp_replace(detail_price, '₱ |,', '', 'g') AS BIGINT) AS detail_price
+    FROM {TBL_NAME};
+    """
+
+    return query
+
+
+def remove_words(text: str, words: frozenset):
     tokens = text.split()
     filtered_tokens = [word for word in tokens if word.lower() not in words]
 
     return " ".join(filtered_tokens)
 
 
-def transform_listing_title(df: pd.DataFrame, col: str, words: list):
-    df[col] = df[col].apply(lambda x: clean(x, no_emoji=True))
-    df[col] = df[col].apply(lambda x: remove_words(x, words))
+@lru_cache(maxsize=TITLE_CACHE_SIZE)
+def normalize_title(title: str, words: frozenset):
+    return remove_words(clean(title, no_emoji=True), words)
+
+
+def transform_listing_title(
+    df: pd.DataFrame, col: str, words: frozenset, n_jobs: int = 1
+):
+    """
+    Cleans the listing titles and removes `words` from them. Dealers repost the same
+    titles constantly, so each distinct title is cleaned once, and titles cleaned in
+    this process are kept in an LRU cache across calls. With `n_jobs` > 1, batches of
+    at least 1,000 distinct titles are cleaned on a process pool instead. Titles cleaned
+    in the pool are cached in its workers only, so they never fill the cache of this
+    process, and a title cleaned by one batch is cleaned again by the next.
+    """
+    words = frozenset(words)
+    titles = list(dict.fromkeys(df[col]))
+
+    if n_jobs > 1 and len(titles) >= 1_000:
+        chunksize = len(titles) // (n_jobs * 4) + 1
+        with ProcessPoolExecutor(
+            max_workers=n_jobs, mp_context=get_pool_context()
+        ) as executor:
+            cleaned_titles = list(
+                executor.map(
+                    normalize_title, titles, repeat(words), chunksize=chunksize
+                )
+            )
+    else:
+        cleaned_titles = [normalize_title(title, words) for title in titles]
+
+    cleaned_titles = dict(zip(titles, cleaned_titles))
+    df[col] = [cleaned_titles[title] for title in df[col]]
 
     return df
 
 
+def get_pool_context():
+    """
+    Returns the start method of the title cleaning pool. The pipelines transform on a
+    background thread while other threads load to the database, and forking a process
+    with live threads can deadlock the child on locks they held. The workers are forked
+    from a single-threaded forkserver instead, which has this module imported already,
+    or spawned where forkserver is not available (e.g. Windows).
+    """
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload([__name__])
+
+    return context
+
+
 def transform_listing_location(df: pd.DataFrame, col: str):
-    df[col] = df[col].apply(lambda x: x.strip())
+    df[col] = df[col].str.strip()
 
     return df
 
 
 # pattern = r"Posted on "
 def transform_date_posted(df: pd.DataFrame, col: str, pattern: str):
-    df[col] = df[col].apply(lambda x: re.sub(pattern, "", x))
-    df[col] = pd.to_datetime(df[col], dayfirst=True)
+    df[col] = df[col].str.replace(re.compile(pattern), "", regex=True)
+    df[col] = pd.to_datetime(df[col], format="%d/%m/%Y")
 
     return df
 
 
 # pattern = r"km|,"
 def transform_mileage(df: pd.DataFrame, col: str, pattern: str):
-    df[col] = df[col].apply(lambda x: -1 if pd.isna(x) else re.sub(pattern, "", x))
-    df[col] = df[col].apply(lambda x: -2 if x == "N/A" else int(x))
+    # Missing mileage is encoded as -1 and "N/A" as -2
+    values = df[col].str.replace(re.compile(pattern), "", regex=True)
+    is_missing = values.isna()
+    is_not_available = values == "N/A"
+    is_numeric = ~(is_missing | is_not_available)
+
+    mileage = pd.Series(-1, index=df.index, dtype="int64")
+    mileage[is_not_available] = -2
+    mileage[is_numeric] = values[is_numeric].astype("int64")
+    df[col] = mileage
 
     return df
 
 
 # pattern = r"₱ |,"
 def transform_price(df: pd.DataFrame, col: str, pattern: str):
-    df[col] = df[col].apply(lambda x: int(re.sub(pattern, "", x)))
-    df[col] = df[col].astype("int")
+    values = df[col].str.replace(re.compile(pattern), "", regex=True)
+    df[col] = values.astype("int")
+
+    return df
+
+
+def transform_year(df: pd.DataFrame, col: str):
+    # Missing years are stored as NULL
+    values = df[col]
+    if values.dtype == object:
+        values = values.str.strip()
+        values = values.mask(values == "")
+    df[col] = pd.to_numeric(values).astype("Int16")
 
     return df
 
 
 # pattern = r"[\r\n\t]+|\s{2,}"
 def transform_complete_desc(df: pd.DataFrame, col: str, pattern: str):
-    df[col] = df[col].apply(
-        lambda x: "" if pd.isna(x) else re.sub(pattern, "", x).strip()
-    )
+    values = df[col].str.replace(re.compile(pattern), "", regex=True)
+    df[col] = values.str.strip().fillna("")
 
     return df
 
 
 # pattern = r'{|}|"'
 def transform_list_cols(df: pd.DataFrame, cols: list, pattern: str):
+    regex = re.compile(pattern)
     for col in cols:
-        # Step 1: Remove unwanted characters using regex
-        df[col] = df[col].apply(
-            lambda x: re.sub(pattern, "", x) if isinstance(x, str) else x
-        )
-        # Step 2: Convert string representation to actual lists
-        df[col] = df[col].apply(
-            lambda x: x.strip("[]").split(",") if isinstance(x, str) else x
-        )
-        # Step 3: Clean empty items from lists
-        df[col] = df[col].apply(lambda x: [item for item in x if item])
+        # Dealers repeat the same lists, so each distinct string is only parsed once
+        parsed = {}
+        values = []
+        for x in df[col]:
+            if isinstance(x, str):
+                items = parsed.get(x)
+                if items is None:
+                    # Step 1: Remove unwanted characters using regex
+                    # Step 2: Convert string representation to actual lists
+                    # Step 3: Clean empty items from lists
+                    items = regex.sub("", x).strip("[]").split(",")
+                    items = parsed[x] = [item for item in items if item]
+                values.append(items.copy())
+            else:
+                values.append([item for item in x if item])
+
+        df[col] = values
 
     return df
 
@@ -141,10 +341,20 @@ def drop_columns(df: pd.DataFrame, cols: list):
     return df
 
 
-def save_data(df):
-    time_stamp = str(datetime.now().date())
-    file_path = f"data/processed_data/full_load_processed_data-{time_stamp}.csv"
-    df.to_csv(file_path, index=False)
+def save_data(df, load_date=None, part=0):
+    """
+    Saves the transformed data as a Parquet snapshot under `data/processed_data`,
+    partitioned by load date. See `utils.io_utils.write_snapshot`.
+    """
+    file_path = write_snapshot(
+        df,
+        PROCESSED_DATA_DIR,
+        load_date=load_date,
+        part=part,
+        schema=arrow_schema(PROCESSED_SCHEMA),
+    )
+
+    return file_path
 
 
 if __name__ == "__main__":
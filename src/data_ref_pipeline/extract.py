@@ -4,8 +4,14 @@ from collections import defaultdict
 from datetime import datetime, timedelta
 
 import pandas as pd
-import requests
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 
+from utils.http_utils import fetch_content
+
 load_dotenv()
+
+
+def get_page_soup(url):
+    page_soup = fetch_content(url)
+    return BeautifulSoup(page_soup, "html.parser")
@@ -0,0 +1,184 @@
+import os
+from datetime import datetime
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from sklearn.preprocessing import OneHotEncoder, TargetEncoder
+
+load_dotenv()
+
+# Categories and list items seen in fewer listings than this are grouped as infrequent
+FEATURE_MIN_FREQUENCY = int(os.getenv("FEATURE_MIN_FREQUENCY", 20))
+
+# A few dozen values each, one-hot encoded
+ONE_HOT_COLUMNS = ["detail_make", "detail_transmission", "detail_status"]
+
+# Hundreds to thousands of values each, replaced by the mean log price of the value
+TARGET_COLUMNS = ["make_model", "listing_location"]
+
+# Lists of features and services, multi-hot encoded
+LIST_COLUMNS = ["detail_features", "additional_services", "negotiation_and_test_drive"]
+
+NUMERIC_COLUMNS = ["detail_year", "detail_mileage", "age", "mileage_per_year"]
+
+# Columns a quote always has. The others may be absent, e.g. in a request to the
+# predictor, and are then treated as missing.
+REQUIRED_COLUMNS = [
+    "detail_make",
+    "detail_model",
+    "detail_year",
+    "detail_mileage",
+    "detail_transmission",
+]
+OPTIONAL_COLUMNS = [
+    "listing_location",
+    "detail_status",
+    "detail_date_posted",
+    *LIST_COLUMNS,
+]
+
+
+class FeatureEncoder:
+    """
+    Turns production rows into a float32 feature matrix for the valuation model. Every
+    step works on whole columns: one-hot encoding of make, transmission and status,
+    target encoding of make and model together and of location, multi-hot encoding of
+    the list columns, and the age of the car and its mileage per year. Missing numbers
+    are kept as NaN, which the gradient boosting models handle natively.
+    """
+
+    def __init__(self, min_frequency: int = FEATURE_MIN_FREQUENCY):
+        self.min_frequency = min_frequency
+
+    def fit(self, df: pd.DataFrame, y):
+        self.fit_transform(df, y)
+
+        return self
+
+    def fit_transform(self, df: pd.DataFrame, y):
+        """
+        Fits the encoders on `df` and the prices `y`, and returns the features of
+        `df`. The target encodings of these rows are cross-fitted, so a row's own
+        price does not leak into its features.
+        """
+        df = self.prepare(df)
+        log_price = np.log1p(np.asarray(y, dtype="float64"))
+
+        self.one_hot_encoder = OneHotEncoder(
+            handle_unknown="infrequent_if_exist",
+            min_frequency=self.min_frequency,
+            sparse_output=False,
+            dtype=np.float32,
+        ).fit(df[ONE_HOT_COLUMNS])
+        self.target_encoder = TargetEncoder(target_type="continuous")
+        target_encoded = self.target_encoder.fit_transform(
+            df[TARGET_COLUMNS], log_price
+        )
+
+        self.vocabularies = {}
+        for col in LIST_COLUMNS:
+            counts = pd.Series(chain.from_iterable(df[col])).value_counts()
+            self.vocabularies[col] = pd.Index(
+                sorted(counts.index[counts >= self.min_frequency])
+            )
+
+        self.feature_names = [
+            *self.one_hot_encoder.get_feature_names_out(),
+            *TARGET_COLUMNS,
+            *(
+                f"{col}_{item}"
+                for col, vocab in self.vocabularies.items()
+                for item in vocab
+            ),
+            *NUMERIC_COLUMNS,
+        ]
+
+        return self.encode(df, target_encoded)
+
+    def transform(self, df: pd.DataFrame):
+        """
+        Returns the features of `df` with the fitted encoders. Unseen categories and
+        list items are encoded as infrequent ones.
+        """
+        df = self.prepare(df)
+
+        return self.encode(df, self.target_encoder.transform(df[TARGET_COLUMNS]))
+
+    def encode(self, df: pd.DataFrame, target_encoded):
+        blocks = [
+            self.one_hot_encoder.transform(df[ONE_HOT_COLUMNS]),
+            target_encoded.astype(np.float32),
+            *(encode_lists(df[col], vocab) for col, vocab in self.vocabularies.items()),
+            np.column_stack([df[col].to_numpy() for col in NUMERIC_COLUMNS]),
+        ]
+
+        return np.hstack(blocks, dtype=np.float32)
+
+    def prepare(self, df: pd.DataFrame):
+        """
+        Returns the columns the features are computed from, with the derived ones. The
+        optional columns `df` lacks are filled as missing.
+
+        Raises:
+            ValueError: If `df` lacks one of `REQUIRED_COLUMNS`.
+        """
+        missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+        if missing:
+            raise ValueError(f"Rows are missing the columns: {missing}.")
+
+        def column(col):
+            if col in df.columns:
+                return df[col].to_numpy()
+            return np.full(len(df), None)
+
+        # Mileage is -1 when missing and -2 when "N/A"
+        year = pd.to_numeric(column("detail_year")).astype("float64")
+        mileage = pd.to_numeric(column("detail_mileage")).astype("float64")
+        mileage[mileage < 0] = np.nan
+
+        # Age at the time of posting, or today for a quote
+        posted_year = pd.DatetimeIndex(column("detail_date_posted")).year.to_numpy()
+        posted_year = np.where(np.isnan(posted_year), datetime.now().year, posted_year)
+        age = np.clip(posted_year - year, 0, None)
+
+        return pd.DataFrame(
+            {
+                **{col: column(col).astype(object) for col in ONE_HOT_COLUMNS},
+                "make_model": df["detail_make"].astype(str).to_numpy()
+                + " "
+                + df["detail_model"].astype(str).to_numpy(),
+                "listing_location": column("listing_location").astype(object),
+                # NULL arrays are read as None
+                **{
+                    col: [
+                        items if isinstance(items, (list, np.ndarray)) else []
+                        for items in column(col)
+                    ]
+                    for col in LIST_COLUMNS
+                },
+                "detail_year": year,
+                "detail_mileage": mileage,
+                "age": age,
+                "mileage_per_year": mileage / np.clip(age, 1, None),
+            }
+        )
+
+
+def encode_lists(values: pd.Series, vocabulary: pd.Index):
+    """
+    Multi-hot encodes a column of lists: one column per item of `vocabulary`, set to 1
+    in the rows whose list contains the item. Items outside the vocabulary are ignored.
+    """
+    encoded = np.zeros((len(values), len(vocabulary)), dtype=np.float32)
+    lengths = np.fromiter((len(items) for items in values), dtype=np.int64)
+    if not lengths.sum() or not len(vocabulary):
+        return encoded
+
+    rows = np.repeat(np.arange(len(values)), lengths)
+    cols = vocabulary.get_indexer(list(chain.from_iterable(values)))
+    known = cols >= 0
+    encoded[rows[known], cols[known]] = 1
+
+    return encoded
@@ -0,0 +1,285 @@
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from sqlalchemy import bindparam, text
+
+from data_pipeline.load import check_table_exists, get_listing_ids
+from data_pipeline.schema import PROCESSED_SCHEMA, arrow_schema
+from features.encoder import FeatureEncoder
+from utils.db_utils import get_db_engine
+from utils.io_utils import (
+    FEATURES_DIR,
+    list_snapshot_dates,
+    list_snapshot_files,
+    load_bundle,
+    read_snapshot,
+    save_bundle,
+    write_snapshot,
+)
+from utils.msc_utils import get_logger
+
+load_dotenv()
+
+# Rows read from the production table per query
+FEATURE_CHUNK_SIZE = int(os.getenv("FEATURE_CHUNK_SIZE", 50_000))
+
+# Columns of the production table the features are built from. The descriptions are
+# never read.
+SOURCE_COLUMNS = [
+    "listing_id",
+    "listing_title",
+    "listing_location",
+    "listing_url",
+    "detail_date_posted",
+    "detail_make",
+    "detail_model",
+    "detail_year",
+    "detail_status",
+    "detail_transmission",
+    "detail_mileage",
+    "detail_features",
+    "negotiation_and_test_drive",
+    "additional_services",
+    "detail_price",
+]
+
+# Columns kept next to each feature matrix, to join predictions back to listings
+ROW_COLUMNS = [
+    "listing_id",
+    "listing_title",
+    "listing_url",
+    "detail_date_posted",
+    "detail_make",
+    "detail_model",
+    "detail_year",
+    "detail_transmission",
+    "detail_mileage",
+    "detail_price",
+]
+
+
+def update_feature_store(
+    DB_NAME: str, TBL_NAME: str, refit=False, root=FEATURES_DIR, load_date=None
+):
+    """
+    Adds the listings of the production table that are not in the feature store yet.
+    Their features are computed with the encoder of the latest version and written as
+    one more part of the `load_date` partition, so the history is never recomputed. The
+    first run, or `refit`, fits a new encoder on the whole table and writes it as a new
+    version. Listings updated in place keep the features of their first load until the
+    next refit.
+
+    Layout of the store:
+        <root>/v<version>/encoder.joblib
+        <root>/v<version>/load_date=<YYYY-MM-DD>/part-<n>.npy      Feature matrix
+        <root>/v<version>/load_date=<YYYY-MM-DD>/part-<n>.parquet  `ROW_COLUMNS`
+
+    Args:
+        DB_NAME (str): Database holding the production table.
+        TBL_NAME (str): Name of the production table.
+        refit (bool): Whether to fit a new version instead of extending the latest one.
+        root (str): Directory of the store.
+        load_date: Partition the new rows are written to. Defaults to today.
+
+    Returns:
+        tuple: The version written to and the number of rows added.
+    """
+    log_console = get_logger("PIPELINE - Features - CO", output_to_file=False)
+    engine = get_db_engine(DB_NAME)
+
+    if not check_table_exists(engine, TBL_NAME):
+        log_console.info(f"{TBL_NAME} does not exist, no features to build.")
+        return None, 0
+
+    versions = list_feature_versions(root)
+    if refit or not versions:
+        version = (versions[-1] + 1) if versions else 1
+        data = read_prod_rows(engine, TBL_NAME)
+        if not len(data):
+            log_console.info(f"{TBL_NAME} is empty, no features to build.")
+            return None, 0
+        encoder = FeatureEncoder()
+        features = encoder.fit_transform(data, data["detail_price"])
+        save_bundle({"encoder": encoder}, encoder_path(root, version))
+        log_console.info(f"Fitted feature version {version} on {len(data)} rows.")
+    else:
+        version = versions[-1]
+        encoder = load_feature_encoder(root, version)
+        stored_ids = set(read_feature_rows(root, version, ["listing_id"])["listing_id"])
+        new_ids = get_listing_ids(DB_NAME, TBL_NAME) - stored_ids
+        data = read_prod_rows(engine, TBL_NAME, listing_ids=new_ids)
+        if not len(data):
+            log_console.info(f"Feature version {version} is up to date.")
+            return version, 0
+        features = encoder.transform(data)
+        log_console.info(
+            f"Encoded {len(data)} new rows with feature version {version}."
+        )
+
+    write_feature_part(data, features, version_dir(root, version), load_date)
+
+    return version, len(data)
+
+
+def read_prod_rows(engine, TBL_NAME: str, listing_ids=None):
+    """
+    Reads `SOURCE_COLUMNS` of the production table, in chunks of `FEATURE_CHUNK_SIZE`
+    rows. With `listing_ids`, only those listings are read.
+    """
+    query = f"SELECT {', '.join(SOURCE_COLUMNS)} FROM {TBL_NAME}"
+
+    if listing_ids is None:
+        with engine.connect().execution_options(stream_results=True) as connection:
+            chunks = list(
+                pd.read_sql(text(query), connection, chunksize=FEATURE_CHUNK_SIZE)
+            )
+    else:
+        listing_ids = sorted(listing_ids)
+        query = text(f"{query} WHERE listing_id IN :listing_ids").bindparams(
+            bindparam("listing_ids", expanding=True)
+        )
+        with engine.connect() as connection:
+            chunks = [
+                pd.read_sql(
+                    query,
+                    connection,
+                    params={"listing_ids": listing_ids[i : i + FEATURE_CHUNK_SIZE]},
+                )
+                for i in range(0, len(listing_ids), FEATURE_CHUNK_SIZE)
+            ]
+
+    if not chunks:
+        return pd.DataFrame(columns=SOURCE_COLUMNS)
+
+    data = pd.concat(chunks, ignore_index=True)
+
+    return data.astype({col: PROCESSED_SCHEMA[col] for col in SOURCE_COLUMNS})
+
+
+def write_feature_part(data: pd.DataFrame, features, directory: str, load_date=None):
+    """
+    Writes a feature matrix and its `ROW_COLUMNS` as the next part of the `load_date`
+    partition of `directory`. The matrix is saved as a plain `.npy` file so it can be
+    memory-mapped.
+    """
+    if load_date is None:
+        load_date = datetime.now().date()
+
+    part = len(list_snapshot_files(directory, [load_date]))
+    file_path = write_snapshot(
+        data[ROW_COLUMNS],
+        directory,
+        load_date,
+        part,
+        schema=arrow_schema(PROCESSED_SCHEMA, ROW_COLUMNS),
+    )
+    np.save(file_path.replace(".parquet", ".npy"), features)
+
+    return file_path
+
+
+def load_feature_store(root=FEATURES_DIR, version=None, load_dates=None):
+    """
+    Loads a version of the feature store, by default the latest.
+
+    Args:
+        root (str): Directory of the store.
+        version (int): Version to load.
+        load_dates (list): Partitions to load. Defaults to all of them.
+
+    Returns:
+        tuple: The feature matrix, a DataFrame of its `ROW_COLUMNS` and the encoder.
+        A store of a single part is memory-mapped rather than read.
+
+    Raises:
+        FileNotFoundError: If the store has no version or no rows.
+    """
+    if version is None:
+        versions = list_feature_versions(root)
+        if not versions:
+            raise FileNotFoundError(f"No feature store found in {root}.")
+        version = versions[-1]
+
+    directory = version_dir(root, version)
+    file_paths = list_snapshot_files(directory, load_dates)
+    if not file_paths:
+        raise FileNotFoundError(f"No features found in {directory} for {load_dates}.")
+
+    matrices = [
+        np.load(file_path.replace(".parquet", ".npy"), mmap_mode="r")
+        for file_path in file_paths
+    ]
+    features = matrices[0] if len(matrices) == 1 else np.concatenate(matrices)
+    rows = read_feature_rows(root, version, load_dates=load_dates)
+
+    return features, rows, load_feature_encoder(root, version)
+
+
+def load_new_features(root, version, start: int):
+    """
+    Loads the rows of a version from position `start` onwards, e.g. the listings added
+    since a model was trained on the first `start` rows. Parts entirely before `start`
+    are not opened.
+
+    Returns:
+        tuple: The feature matrix and a DataFrame of its `ROW_COLUMNS`.
+    """
+    matrices = []
+    rows = []
+    offset = 0
+    for file_path in list_snapshot_files(version_dir(root, version)):
+        matrix = np.load(file_path.replace(".parquet", ".npy"), mmap_mode="r")
+        part_start = max(start - offset, 0)
+        offset += len(matrix)
+        if part_start >= len(matrix):
+            continue
+
+        matrices.append(matrix[part_start:])
+        rows.append(pd.read_parquet(file_path).iloc[part_start:])
+
+    if not matrices:
+        return np.empty((0, 0), dtype=np.float32), pd.DataFrame(columns=ROW_COLUMNS)
+
+    return np.concatenate(matrices), pd.concat(rows, ignore_index=True)
+
+
+def read_feature_rows(root, version, columns=None, load_dates=None):
+    """
+    Reads the `ROW_COLUMNS` of a version, in the order of its feature matrices.
+    """
+    directory = version_dir(root, version)
+    if not list_snapshot_dates(directory):
+        return pd.DataFrame(columns=columns or ROW_COLUMNS)
+
+    rows = read_snapshot(directory, columns=columns, load_dates=load_dates)
+
+    return rows.drop(columns="load_date", errors="ignore")
+
+
+def load_feature_encoder(root, version):
+    return load_bundle(encoder_path(root, version))["encoder"]
+
+
+def list_feature_versions(root=FEATURES_DIR):
+    """
+    Returns the versions present in the feature store at `root`, oldest first.
+    """
+    if not os.path.isdir(root):
+        return []
+
+    return sorted(
+        int(name[1:])
+        for name in os.listdir(root)
+        if name.startswith("v") and name[1:].isdigit()
+    )
+
+
+def version_dir(root, version):
+    return os.path.join(root, f"v{version}")
+
+
+def encoder_path(root, version):
+    return os.path.join(version_dir(root, version), "encoder.joblib")
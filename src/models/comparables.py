@@ -0,0 +1,191 @@
+import os
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from sklearn.neighbors import KDTree
+
+from features.store import (
+    list_feature_versions,
+    load_feature_store,
+    load_new_features,
+    read_feature_rows,
+)
+from utils.io_utils import FEATURES_DIR, MODELS_DIR, load_bundle, save_bundle
+from utils.msc_utils import get_logger
+
+load_dotenv()
+
+COMPARABLES_PATH = os.getenv(
+    "COMPARABLES_PATH", os.path.join(MODELS_DIR, "comparables.joblib")
+)
+
+# Features the listings are compared on, and their weights, in years: 20,000 km count
+# as one year, and a different transmission as three
+COMPARABLE_WEIGHTS = {
+    "detail_year": 1.0,
+    "detail_mileage": 1 / 20_000,
+    "detail_transmission_": 3.0 / np.sqrt(2),
+}
+
+# Columns of a comparable listing returned to buyers
+COMPARABLE_COLUMNS = [
+    "listing_id",
+    "listing_title",
+    "listing_url",
+    "detail_year",
+    "detail_mileage",
+    "detail_transmission",
+    "detail_price",
+]
+
+
+def update_comparables_index(root=FEATURES_DIR, index_path=COMPARABLES_PATH):
+    """
+    Keeps the comparable listings index in step with the feature store. Listings are
+    partitioned by make and model, and each partition holds a KD-tree of their weighted
+    `COMPARABLE_WEIGHTS` features, so a query only searches the cars of the same model.
+    Only the partitions that received new listings since the last update are rebuilt;
+    a new feature version rebuilds the whole index. The index holds the positions of
+    the listings in the feature store, not the listings themselves, so its size and
+    the time to save it do not grow with their titles and URLs.
+
+    Args:
+        root (str): Directory of the feature store.
+        index_path (str): Path of the index, saved with `utils.io_utils.save_bundle`.
+
+    Returns:
+        int: The number of partitions rebuilt.
+    """
+    log_console = get_logger("PIPELINE - Comparables - CO", output_to_file=False)
+
+    versions = list_feature_versions(root)
+    if not versions:
+        log_console.info("No feature store found, no comparables to index.")
+        return 0
+    version = versions[-1]
+
+    index = None
+    if os.path.exists(index_path):
+        # Not memory-mapped, as the index is modified
+        index = load_bundle(index_path, mmap_mode=None)
+
+    if index is None or index["feature_version"] != version:
+        features, rows, encoder = load_feature_store(root, version)
+        columns, weights = comparable_columns(encoder.feature_names)
+        index = {
+            "feature_root": root,
+            "feature_version": version,
+            "feature_rows": 0,
+            "encoder": encoder,
+            "columns": columns,
+            "weights": weights,
+            # Missing years and mileages are compared as the median ones
+            "fill": np.nanmedian(features[:, columns] * weights, axis=0),
+            "partitions": {},
+        }
+    else:
+        features, rows = load_new_features(root, version, index["feature_rows"])
+        if not len(rows):
+            log_console.info("Comparables index is up to date.")
+            return 0
+
+    # Listings without a price are no use as comparables
+    prices = rows["detail_price"].to_numpy(dtype="float64", na_value=np.nan)
+    (priced,) = np.nonzero(prices > 0)
+    features, rows = features[priced], rows.iloc[priced]
+
+    vectors = to_vectors(index, features)
+    positions = index["feature_rows"] + priced
+    index["feature_rows"] += len(prices)
+
+    groups = rows.groupby(["detail_make", "detail_model"], observed=True).indices
+    for key, group in groups.items():
+        key = tuple(str(value) for value in key)
+        partition_vectors = vectors[group]
+        partition_positions = positions[group]
+
+        if key in index["partitions"]:
+            tree, old_positions = index["partitions"][key]
+            partition_vectors = np.vstack([tree.get_arrays()[0], partition_vectors])
+            partition_positions = np.concatenate([old_positions, partition_positions])
+
+        index["partitions"][key] = (KDTree(partition_vectors), partition_positions)
+
+    save_bundle(index, index_path)
+    log_console.info(
+        f"Indexed {len(rows)} new listings, {len(groups)} of "
+        f"{len(index['partitions'])} make and model partitions rebuilt."
+    )
+
+    return len(groups)
+
+
+def load_comparables_index(index_path=COMPARABLES_PATH):
+    """
+    Loads the index with its trees memory-mapped, and the `COMPARABLE_COLUMNS` of the
+    feature store version it was built on.
+    """
+    index = load_bundle(index_path)
+    index["rows"] = read_feature_rows(
+        index["feature_root"], index["feature_version"], columns=COMPARABLE_COLUMNS
+    )
+
+    return index
+
+
+def find_comparables(index: dict, quotes: pd.DataFrame, k: int = 5):
+    """
+    Returns the `k` listings of the same make and model closest to each quote, with
+    their `distance` to it in weighted years.
+
+    Args:
+        index (dict): Loaded by `load_comparables_index`.
+        quotes (pd.DataFrame): Rows as built by `models.predict.quotes_to_df`.
+        k (int): Number of comparables per quote.
+
+    Returns:
+        list: One DataFrame of `COMPARABLE_COLUMNS` and `distance` per quote, empty if
+        the make and model of the quote were never listed.
+    """
+    vectors = to_vectors(index, index["encoder"].transform(quotes))
+    keys = zip(quotes["detail_make"].astype(str), quotes["detail_model"].astype(str))
+
+    comparables = []
+    for vector, key in zip(vectors, keys):
+        partition = index["partitions"].get(key)
+        if partition is None:
+            comparables.append(index["rows"].iloc[:0].assign(distance=[]))
+            continue
+
+        tree, positions = partition
+        distances, found = tree.query(vector[None, :], k=min(k, len(positions)))
+        comparables.append(
+            index["rows"].iloc[positions[found[0]]].assign(distance=distances[0])
+        )
+
+    return comparables
+
+
+def comparable_columns(feature_names: list):
+    """
+    Returns the positions of the `COMPARABLE_WEIGHTS` features among `feature_names`,
+    and their weights. A name ending with `_` selects every one-hot column of it.
+    """
+    columns = []
+    weights = []
+    for prefix, weight in COMPARABLE_WEIGHTS.items():
+        for position, name in enumerate(feature_names):
+            if name == prefix or (prefix.endswith("_") and name.startswith(prefix)):
+                columns.append(position)
+                weights.append(weight)
+
+    return np.array(columns), np.array(weights, dtype=np.float32)
+
+
+def to_vectors(index: dict, features):
+    vectors = np.asarray(features[:, index["columns"]] * index["weights"])
+    is_missing = np.isnan(vectors)
+    vectors[is_missing] = np.broadcast_to(index["fill"], vectors.shape)[is_missing]
+
+    return vectors
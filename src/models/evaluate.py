@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+
+def evaluate(prices, predicted, makes):
+    """
+    Computes the error of predicted prices, overall and for each make.
+
+    Args:
+        prices (array-like): Listed prices.
+        predicted (array-like): Predicted prices.
+        makes (array-like): Make of each listing.
+
+    Returns:
+        tuple: A dict with the overall `mae` and `mape`, and a DataFrame with the `rows`,
+        `mae` and `mape` of each make, largest makes first.
+    """
+    prices = np.asarray(prices, dtype="float64")
+    errors = pd.DataFrame(
+        {
+            "make": np.asarray(makes, dtype=object),
+            "absolute_error": np.abs(np.asarray(predicted, dtype="float64") - prices),
+        }
+    )
+    errors["percentage_error"] = errors["absolute_error"] / prices
+
+    overall = {
+        "mae": errors["absolute_error"].mean(),
+        "mape": errors["percentage_error"].mean(),
+    }
+    per_make = (
+        errors.groupby("make", observed=True)
+        .agg(
+            rows=("absolute_error", "size"),
+            mae=("absolute_error", "mean"),
+            mape=("percentage_error", "mean"),
+        )
+        .sort_values("rows", ascending=False)
+        .reset_index()
+    )
+
+    return overall, per_make
+
+
+def evaluate_bundle(bundle: dict, features, rows: pd.DataFrame):
+    """
+    Evaluates the model of a bundle on rows of the feature store, e.g. those loaded
+    after it was trained.
+    """
+    predicted = bundle["model"].predict(features)
+
+    return evaluate(rows["detail_price"], predicted, rows["detail_make"])
@@ -0,0 +1,215 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+from functools import lru_cache
+from queue import Empty, Queue
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+from data_pipeline.schema import PROCESSED_SCHEMA
+from models.comparables import (
+    COMPARABLES_PATH,
+    find_comparables,
+    load_comparables_index,
+)
+from utils.io_utils import MODELS_DIR, load_bundle
+
+load_dotenv()
+
+MODEL_PATH = os.getenv("MODEL_PATH", os.path.join(MODELS_DIR, "valuation_model.joblib"))
+
+# Number of recent quotes answered from memory
+QUOTE_CACHE_SIZE = int(os.getenv("QUOTE_CACHE_SIZE", 10_000))
+
+# Concurrent quotes are grouped into one predict call of at most this many rows, waiting
+# at most this long for a batch to fill
+PREDICT_MAX_BATCH_SIZE = int(os.getenv("PREDICT_MAX_BATCH_SIZE", 64))
+PREDICT_MAX_WAIT_MS = float(os.getenv("PREDICT_MAX_WAIT_MS", 1))
+
+# Fields of a quote request and the production columns they map to
+QUOTE_FIELDS = {
+    "make": "detail_make",
+    "model": "detail_model",
+    "year": "detail_year",
+    "mileage": "detail_mileage",
+    "transmission": "detail_transmission",
+}
+
+
+def quotes_to_df(quotes: list):
+    """
+    Builds the frame the encoder of a bundle transforms from quotes given as dicts keyed
+    by `QUOTE_FIELDS`, with the column names and dtypes of the production rows.
+
+    Raises:
+        ValueError: If a quote misses one of the fields.
+    """
+    missing = {
+        field for quote in quotes for field in QUOTE_FIELDS if field not in quote
+    }
+    if missing:
+        raise ValueError(f"Quotes are missing the fields: {sorted(missing)}.")
+
+    df = pd.DataFrame(
+        {col: [quote[field] for quote in quotes] for field, col in QUOTE_FIELDS.items()}
+    )
+
+    return df.astype({col: PROCESSED_SCHEMA[col] for col in df.columns})
+
+
+def predict_batch(bundle: dict, quotes: list):
+    """
+    Predicts the price of each quote with one vectorized call of the bundle's encoder
+    and model.
+
+    Args:
+        bundle (dict): Loaded by `utils.io_utils.load_bundle`.
+        quotes (list): Dicts keyed by `QUOTE_FIELDS`.
+
+    Returns:
+        np.ndarray: One price per quote.
+    """
+    if not quotes:
+        return np.empty(0)
+
+    features = bundle["encoder"].transform(quotes_to_df(quotes))
+
+    return bundle["model"].predict(features)
+
+
+class Predictor:
+    """
+    Serves price suggestions from a model bundle loaded once. Single quotes submitted
+    from concurrent threads are collected by a background thread and predicted
+    together, since a predict call costs about the same for one row as for a few dozen.
+    Recent quotes are kept in an LRU cache. Comparable listings are served from the
+    index at `comparables_path`, when it has been built.
+    """
+
+    def __init__(
+        self,
+        model_path: str = MODEL_PATH,
+        max_batch_size: int = PREDICT_MAX_BATCH_SIZE,
+        max_wait_ms: float = PREDICT_MAX_WAIT_MS,
+        cache_size: int = QUOTE_CACHE_SIZE,
+        comparables_path: str = COMPARABLES_PATH,
+    ):
+        self.model_path = model_path
+        self.bundle = load_bundle(model_path)
+        self.comparables_index = None
+        if os.path.exists(comparables_path):
+            self.comparables_index = load_comparables_index(comparables_path)
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_wait = max_wait_ms / 1000
+        self.cached_quote = lru_cache(maxsize=cache_size)(self.submit_quote)
+
+        self.queue = Queue()
+        self.thread = threading.Thread(
+            target=self.run_batches, name="predictor", daemon=True
+        )
+        self.thread.start()
+
+    def predict(self, quotes: list):
+        """
+        Predicts a batch of quotes in the calling thread, bypassing the cache.
+        """
+        return predict_batch(self.bundle, quotes)
+
+    def quote(self, make, model, year, mileage, transmission):
+        """
+        Returns the predicted price of one listing, from the cache when it was quoted
+        recently, otherwise batched with the quotes of other threads.
+        """
+        return self.cached_quote(make, model, int(year), int(mileage), transmission)
+
+    def comparables(self, quote: dict, k: int = 5):
+        """
+        Returns the `k` listings of the same make and model closest to a quote, as
+        dicts, with their prices and their `distance` to it.
+
+        Raises:
+            LookupError: If no comparables index was found at startup.
+        """
+        if self.comparables_index is None:
+            raise LookupError("No comparables index is loaded.")
+
+        (comparables,) = find_comparables(
+            self.comparables_index, quotes_to_df([quote]), k
+        )
+
+        # Missing years and mileages as None, so the records are JSON serializable
+        comparables = comparables.astype(object).where(comparables.notna(), None)
+
+        return comparables.to_dict("records")
+
+    def submit_quote(self, make, model, year, mileage, transmission):
+        quote = {
+            "make": make,
+            "model": model,
+            "year": year,
+            "mileage": mileage,
+            "transmission": transmission,
+        }
+
+        return self.submit(quote).result()
+
+    def submit(self, quote: dict):
+        """
+        Queues one quote for the next batch and returns a Future of its price.
+        """
+        future = Future()
+        self.queue.put((quote, future))
+
+        return future
+
+    def run_batches(self):
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is None:
+                return
+
+            # Take what is already queued, then wait briefly for the batch to fill
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        item = self.queue.get(timeout=remaining)
+                    else:
+                        item = self.queue.get_nowait()
+                except Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self.predict_futures(batch)
+
+    def predict_futures(self, batch: list):
+        quotes = [quote for quote, _ in batch]
+        futures = [future for _, future in batch]
+        try:
+            prices = self.predict(quotes)
+        except Exception as error:
+            if len(batch) == 1:
+                futures[0].set_exception(error)
+                return
+            # Predict the quotes one by one, so an invalid quote only fails itself
+            for item in batch:
+                self.predict_futures([item])
+        else:
+            for future, price in zip(futures, prices):
+                future.set_result(float(price))
+
+    def close(self):
+        """
+        Stops the batching thread once the queued quotes are predicted.
+        """
+        self.queue.put(None)
+        self.thread.join()
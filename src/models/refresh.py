@@ -0,0 +1,144 @@
+import os
+from datetime import datetime
+
+import numpy as np
+from dotenv import load_dotenv
+from sklearn.ensemble import HistGradientBoostingRegressor
+
+from features.store import load_new_features, update_feature_store
+from models.evaluate import evaluate
+from models.predict import MODEL_PATH
+from models.train import train_model
+from utils.io_utils import FEATURES_DIR, load_bundle, save_bundle
+from utils.msc_utils import get_logger
+
+load_dotenv()
+
+# The model is retrained from scratch when its MAPE on the new listings exceeds its
+# cross-validated MAPE by more than this fraction
+REFRESH_DRIFT_THRESHOLD = float(os.getenv("REFRESH_DRIFT_THRESHOLD", 0.2))
+
+# New listings are accumulated until there are enough of them to measure the drift
+REFRESH_MIN_ROWS = int(os.getenv("REFRESH_MIN_ROWS", 500))
+
+# Boosting iterations of each correction
+REFRESH_MAX_ITER = int(os.getenv("REFRESH_MAX_ITER", 50))
+
+# Each correction adds a predict call, so the model is retrained after this many
+REFRESH_MAX_CORRECTIONS = int(os.getenv("REFRESH_MAX_CORRECTIONS", 30))
+
+
+class RefreshedModel:
+    """
+    A trained model followed by corrections fitted on the listings loaded since. Each
+    correction is a small gradient boosting model of the log price error left by the
+    model and the corrections before it, like the trees a warm start adds to an
+    ensemble. Warm-starting the model itself on the new listings alone is not
+    possible, as it re-bins the features on every fit, which the existing trees were
+    not grown on.
+    """
+
+    def __init__(self, model, corrections=None):
+        self.model = model
+        self.corrections = corrections or []
+
+    def predict(self, features):
+        log_price = np.log1p(self.model.predict(features))
+        for correction in self.corrections:
+            log_price += correction.predict(features)
+
+        return np.expm1(log_price)
+
+    def add_correction(self, features, prices, params: dict):
+        """
+        Fits one more correction on `features` and their listed `prices`.
+        """
+        residuals = np.log1p(prices) - np.log1p(self.predict(features))
+        correction = HistGradientBoostingRegressor(
+            max_iter=REFRESH_MAX_ITER, random_state=0, **params
+        ).fit(features, residuals)
+        self.corrections.append(correction)
+
+        return self
+
+
+def refresh_model(
+    DB_NAME: str, TBL_NAME: str, root=FEATURES_DIR, model_path=MODEL_PATH
+):
+    """
+    Keeps the exported model current after a load to the production table. The new
+    listings are added to the feature store, and the model is evaluated on them. If
+    its error has drifted beyond `REFRESH_DRIFT_THRESHOLD`, the model is retrained
+    from scratch with `models.train.train_model`. Otherwise it is updated from the new
+    listings only, with one more correction of `RefreshedModel`.
+
+    Args:
+        DB_NAME (str): Database holding the production table.
+        TBL_NAME (str): Name of the production table.
+        root (str): Directory of the feature store.
+        model_path (str): Path of the exported bundle.
+
+    Returns:
+        str: "trained", "retrained", "refreshed" or "skipped".
+    """
+    log_console = get_logger("PIPELINE - Refresh - CO", output_to_file=False)
+
+    log_console.info("Initiating: Model refresh.")
+
+    version, _ = update_feature_store(DB_NAME, TBL_NAME, root=root)
+    if version is None:
+        return "skipped"
+
+    if not os.path.exists(model_path):
+        log_console.info("No model exported yet, training one.")
+        train_model(root, model_path)
+        return "trained"
+
+    # Not memory-mapped, as the model is modified
+    bundle = load_bundle(model_path, mmap_mode=None)
+    if bundle["feature_version"] != version:
+        log_console.info(f"Features are now version {version}, retraining the model.")
+        train_model(root, model_path)
+        return "retrained"
+
+    features, rows = load_new_features(root, version, bundle["feature_rows"])
+    new_rows = len(rows)
+    prices = rows["detail_price"].to_numpy(dtype="float64", na_value=np.nan)
+    is_priced = prices > 0
+    if is_priced.sum() < REFRESH_MIN_ROWS:
+        log_console.info(f"{is_priced.sum()} new listings, waiting for more.")
+        return "skipped"
+
+    features, prices = features[is_priced], prices[is_priced]
+    makes = rows["detail_make"].to_numpy()[is_priced]
+
+    model = bundle["model"]
+    overall, _ = evaluate(prices, model.predict(features), makes)
+    drift = overall["mape"] / bundle["cv_mape"] - 1
+    log_console.info(
+        f"MAPE on {len(prices)} new listings: {overall['mape']:.3f}, "
+        f"{drift:+.0%} from cross-validation."
+    )
+
+    if not isinstance(model, RefreshedModel):
+        model = RefreshedModel(model)
+
+    has_drifted = drift > REFRESH_DRIFT_THRESHOLD
+    if has_drifted or len(model.corrections) >= REFRESH_MAX_CORRECTIONS:
+        log_console.info("Retraining the model.")
+        train_model(root, model_path)
+        return "retrained"
+
+    model.add_correction(features, prices, bundle["params"])
+    bundle.update(
+        model=model,
+        feature_rows=bundle["feature_rows"] + new_rows,
+        refreshed_at=datetime.now(),
+        refresh_mape=overall["mape"],
+    )
+    save_bundle(bundle, model_path)
+    log_console.info(
+        f"Exiting: Model refreshed with {len(model.corrections)} corrections."
+    )
+
+    return "refreshed"
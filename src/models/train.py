@@ -0,0 +1,232 @@
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from itertools import product
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from sklearn.compose import TransformedTargetRegressor
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.model_selection import KFold
+from threadpoolctl import threadpool_limits
+
+from features.store import list_feature_versions, load_feature_store
+from models.evaluate import evaluate
+from models.predict import MODEL_PATH
+from utils.io_utils import FEATURES_DIR, MODELS_DIR, save_bundle
+from utils.msc_utils import get_logger
+
+load_dotenv()
+
+# Hyperparameters searched, every combination is cross-validated
+PARAM_GRID = {
+    "learning_rate": [0.05, 0.1],
+    "max_leaf_nodes": [31, 63],
+    "min_samples_leaf": [20, 100],
+}
+
+CV_FOLDS = int(os.getenv("CV_FOLDS", 5))
+
+# The search runs on a random sample of at most this many listings, so its duration
+# does not grow with the table. The best parameters are then fitted on all of them.
+CV_MAX_ROWS = int(os.getenv("CV_MAX_ROWS", 200_000))
+
+# Boosting stops once the validation error has not improved for 10 iterations
+TRAIN_MAX_ITER = int(os.getenv("TRAIN_MAX_ITER", 500))
+
+TRAIN_N_JOBS = int(os.getenv("TRAIN_N_JOBS", os.cpu_count() or 1))
+
+
+def make_model(params: dict):
+    """
+    Returns an unfitted valuation model. Prices span two orders of magnitude, so the
+    gradient boosting model is fitted on log prices, and predicts prices.
+    """
+    regressor = HistGradientBoostingRegressor(
+        max_iter=TRAIN_MAX_ITER, early_stopping=True, random_state=0, **params
+    )
+
+    return TransformedTargetRegressor(
+        regressor=regressor, func=np.log1p, inverse_func=np.expm1
+    )
+
+
+def train_model(root=FEATURES_DIR, model_path=MODEL_PATH, param_grid=None):
+    """
+    Cross-validates `param_grid` on the latest version of the feature store, fits the
+    best parameters on all of its listings and exports them with the feature encoder
+    as the bundle served by `models.predict.Predictor`.
+
+    Args:
+        root (str): Directory of the feature store.
+        model_path (str): Destination of the bundle.
+        param_grid (dict): Lists of values per hyperparameter. Defaults to `PARAM_GRID`.
+
+    Returns:
+        tuple: The bundle, one row of metrics per parameters and fold, and one row per
+        parameters, fold and make. Both are also saved next to the bundle.
+    """
+    log_console = get_logger("PIPELINE - Train - CO", output_to_file=False)
+
+    features, rows, encoder = load_feature_store(root)
+    feature_rows = len(rows)
+    prices = rows["detail_price"].to_numpy(dtype="float64", na_value=np.nan)
+    is_priced = prices > 0
+    if not is_priced.all():
+        features, rows = features[is_priced], rows[is_priced]
+        prices = prices[is_priced]
+    log_console.info(f"Training on {len(rows)} listings, {features.shape[1]} features.")
+
+    runs, runs_per_make = cross_validate(
+        features, prices, rows["detail_make"], param_grid or PARAM_GRID
+    )
+    summary = summarize_runs(runs)
+    best = summary.iloc[0]
+    params = json.loads(best["params"])
+    log_console.info(f"Cross-validation:\n{summary.to_string(index=False)}")
+
+    start = time.perf_counter()
+    model = make_model(params).fit(features, prices)
+    log_console.info(
+        f"Fitted {params} on all listings in {time.perf_counter() - start:.1f}s."
+    )
+
+    bundle = {
+        "model": model,
+        "encoder": encoder,
+        "params": params,
+        "feature_version": list_feature_versions(root)[-1],
+        "trained_at": datetime.now(),
+        "trained_rows": len(rows),
+        # The store is append-only, so later refreshes start at this row
+        "feature_rows": feature_rows,
+        "cv_mae": best["mae"],
+        "cv_mape": best["mape"],
+    }
+    save_bundle(bundle, model_path)
+
+    directory = os.path.dirname(model_path) or MODELS_DIR
+    runs.to_parquet(os.path.join(directory, "cv_runs.parquet"), index=False)
+    runs_per_make.to_parquet(
+        os.path.join(directory, "cv_runs_per_make.parquet"), index=False
+    )
+
+    return bundle, runs, runs_per_make
+
+
+def cross_validate(
+    features,
+    prices,
+    makes,
+    param_grid: dict,
+    n_folds=CV_FOLDS,
+    n_jobs=TRAIN_N_JOBS,
+    max_rows=CV_MAX_ROWS,
+):
+    """
+    Runs k-fold cross-validation of every combination of `param_grid`, one fit per
+    process. The sampled listings are written once as `.npy` files which the workers
+    memory-map, so they are not copied into each task.
+
+    Returns:
+        tuple: One row per parameters and fold with the fit time, peak memory, MAE and
+        MAPE, and one row per parameters, fold and make with its MAE and MAPE.
+    """
+    rng = np.random.default_rng(0)
+    sample = np.arange(len(prices))
+    if len(sample) > max_rows:
+        sample = np.sort(rng.choice(sample, max_rows, replace=False))
+
+    combinations = [
+        dict(zip(param_grid, values)) for values in product(*param_grid.values())
+    ]
+    folds = list(KFold(n_folds, shuffle=True, random_state=0).split(sample))
+
+    with tempfile.TemporaryDirectory() as directory:
+        np.save(os.path.join(directory, "features.npy"), features[sample])
+        np.save(os.path.join(directory, "prices.npy"), prices[sample])
+        np.save(
+            os.path.join(directory, "makes.npy"),
+            np.asarray(makes, dtype=str)[sample],
+        )
+
+        tasks = [
+            (directory, params, fold, train_index, test_index)
+            for params in combinations
+            for fold, (train_index, test_index) in enumerate(folds)
+        ]
+        if n_jobs > 1:
+            # Each process fits on one core, instead of every fit competing for all
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                results = list(executor.map(run_fold, *zip(*tasks), [1] * len(tasks)))
+        else:
+            results = [run_fold(*task) for task in tasks]
+
+    runs = pd.DataFrame([run for run, _ in results])
+    runs_per_make = pd.concat([per_make for _, per_make in results], ignore_index=True)
+
+    return runs, runs_per_make
+
+
+@lru_cache(maxsize=1)
+def load_fold_data(directory: str):
+    return tuple(
+        np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+        for name in ("features", "prices", "makes")
+    )
+
+
+def run_fold(directory, params, fold, train_index, test_index, n_threads=None):
+    """
+    Fits one combination of parameters on one fold and measures it.
+    """
+    features, prices, makes = load_fold_data(directory)
+
+    with threadpool_limits(limits=n_threads):
+        tracemalloc.start()
+        start = time.perf_counter()
+        model = make_model(params).fit(features[train_index], prices[train_index])
+        fit_seconds = time.perf_counter() - start
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        predicted = model.predict(features[test_index])
+
+    overall, per_make = evaluate(prices[test_index], predicted, makes[test_index])
+
+    run = {
+        "params": json.dumps(params, sort_keys=True),
+        "fold": fold,
+        "train_rows": len(train_index),
+        "iterations": model.regressor_.n_iter_,
+        "fit_seconds": fit_seconds,
+        "peak_memory_mb": peak_memory / 1e6,
+        **overall,
+    }
+    per_make.insert(0, "params", run["params"])
+    per_make.insert(1, "fold", fold)
+
+    return run, per_make
+
+
+def summarize_runs(runs: pd.DataFrame):
+    """
+    Averages the runs of each combination of parameters over the folds, best MAPE first.
+    """
+    return (
+        runs.groupby("params")
+        .agg(
+            mae=("mae", "mean"),
+            mape=("mape", "mean"),
+            fit_seconds=("fit_seconds", "mean"),
+            peak_memory_mb=("peak_memory_mb", "max"),
+        )
+        .sort_values("mape")
+        .reset_index()
+    )
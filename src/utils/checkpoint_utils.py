@@ -0,0 +1,94 @@
+import os
+import sqlite3
+import threading
+
+
+class ScrapeCheckpoint:
+    """
+    Records the progress of a scrape in a local SQLite file so that an interrupted run
+    can resume where it stopped. Progress is committed only after a chunk has been
+    written to the staging table, so everything recorded here is already loaded.
+    """
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS run_state (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS fetched_listings (listing_id TEXT PRIMARY KEY);
+            """
+        )
+        self.connection.commit()
+
+    def get(self, key: str, default=None):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value FROM run_state WHERE key = ?", (key,)
+            ).fetchone()
+
+        return row[0] if row else default
+
+    def set(self, key: str, value):
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO run_state (key, value) VALUES (?, ?)",
+                (key, str(value)),
+            )
+            self.connection.commit()
+
+    def setdefault(self, key: str, value) -> str:
+        """
+        Returns the value recorded for `key`, recording `value` first if there is none.
+        """
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR IGNORE INTO run_state (key, value) VALUES (?, ?)",
+                (key, str(value)),
+            )
+            self.connection.commit()
+            row = self.connection.execute(
+                "SELECT value FROM run_state WHERE key = ?", (key,)
+            ).fetchone()
+
+        return row[0]
+
+    def last_page(self) -> int:
+        """
+        Returns the last results page whose listings have all been loaded, or 0.
+        """
+        return int(self.get("last_page", 0))
+
+    def fetched_listing_ids(self) -> set:
+        with self.lock:
+            rows = self.connection.execute("SELECT listing_id FROM fetched_listings")
+            return {row[0] for row in rows}
+
+    def commit(self, chunk):
+        """
+        Marks the listings of a loaded chunk as fetched and advances the last completed
+        page to the one recorded in `chunk.attrs["last_page"]`.
+        """
+        with self.lock:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO fetched_listings (listing_id) VALUES (?)",
+                ((listing_id,) for listing_id in chunk["listing_id"].dropna()),
+            )
+            if "last_page" in chunk.attrs:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO run_state (key, value) VALUES (?, ?)",
+                    ("last_page", str(chunk.attrs["last_page"])),
+                )
+            self.connection.commit()
+
+    def clear(self):
+        with self.lock:
+            self.connection.execute("DELETE FROM run_state")
+            self.connection.execute("DELETE FROM fetched_listings")
+            self.connection.commit()
+
+    def close(self):
+        self.connection.close()
@@ -1,4 +1,6 @@
+import atexit
 import os
+import threading
 from dataclasses import dataclass
 
 from dotenv import load_dotenv
@@ -6,6 +8,9 @@ from sqlalchemy import create_engine
 
 load_dotenv()
 
+_engines = {}
+_engines_lock = threading.Lock()
+
 
 @dataclass
 class DBSecrets:
@@ -25,10 +30,46 @@ def get_db_creds():
 
 
 def create_db_engine(DB_NAME: str):
+    """
+    Creates an engine whose connection pool is tuned with `DB_POOL_SIZE`,
+    `DB_MAX_OVERFLOW` and `DB_POOL_RECYCLE` (seconds). Connections are pinged before
+    being handed out so that ones dropped by the server are replaced transparently.
+    """
     secrets = get_db_creds()
 
     engine = create_engine(
-        f"postgresql+psycopg2://{secrets.DB_USER}:{secrets.DB_PASS}@{secrets.DB_HOST}:{secrets.DB_PORT}/{DB_NAME}"
+        f"postgresql+psycopg2://{secrets.DB_USER}:{secrets.DB_PASS}@{secrets.DB_HOST}:{secrets.DB_PORT}/{DB_NAME}",
+        pool_size=int(os.getenv("DB_POOL_SIZE", 5)),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", 1800)),
+        pool_pre_ping=True,
     )
 
     return engine
+
+
+def get_db_engine(DB_NAME: str):
+    """
+    Returns the process-wide engine of the database, creating it on first use, so that
+    every pipeline stage shares one connection pool per database.
+    """
+    with _engines_lock:
+        engine = _engines.get(DB_NAME)
+        if engine is None:
+            engine = create_db_engine(DB_NAME)
+            _engines[DB_NAME] = engine
+
+    return engine
+
+
+def dispose_db_engines():
+    """
+    Closes the pooled connections of every engine. The engines stay registered and
+    reconnect on their next use.
+    """
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+
+
+atexit.register(dispose_db_engines)
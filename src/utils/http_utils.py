@@ -0,0 +1,412 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+_session = None
+_session_lock = threading.Lock()
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+# Rate Limiting Functions
+class TokenBucket:
+    """
+    Thread-safe token bucket. Allows `rate` requests per second on average, with bursts
+    of up to `capacity` requests.
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        if rate <= 0:
+            raise ValueError("rate must be greater than 0.")
+
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Blocks until a token is available, then consumes it.
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated_at) * self.rate
+                )
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """
+    Keeps one TokenBucket per host so that each website is throttled independently.
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, url: str):
+        host = urlsplit(url).netloc
+
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.capacity)
+                self.buckets[host] = bucket
+
+        bucket.acquire()
+
+
+# Session Functions
+@dataclass
+class RequestStats:
+    """
+    Thread-safe latency counters for the requests sent through `fetch`.
+    """
+
+    count: int = 0
+    errors: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, elapsed: float, failed: bool = False):
+        with self.lock:
+            self.count += 1
+            self.errors += int(failed)
+            self.total_seconds += elapsed
+            self.max_seconds = max(self.max_seconds, elapsed)
+
+    def reset(self):
+        with self.lock:
+            self.count = 0
+            self.errors = 0
+            self.total_seconds = 0.0
+            self.max_seconds = 0.0
+
+    def summary(self):
+        with self.lock:
+            mean = self.total_seconds / self.count if self.count else 0.0
+            return (
+                f"{self.count} requests | {self.errors} errors | "
+                f"mean {mean:.3f}s | max {self.max_seconds:.3f}s"
+            )
+
+
+REQUEST_STATS = RequestStats()
+
+
+def create_session(pool_size=None, max_retries=None, backoff_factor=None):
+    """
+    Creates a keep-alive session whose connections are pooled and reused across requests.
+    Requests answered with 429/5xx are retried with exponential backoff and jitter, and
+    `Retry-After` headers are honoured.
+
+    Args:
+        pool_size (int): Connections kept open per host. Defaults to `HTTP_POOL_SIZE`, or 10.
+        max_retries (int): Retries per request. Defaults to `HTTP_MAX_RETRIES`, or 5.
+        backoff_factor (float): Base of the exponential backoff in seconds. Defaults to
+            `HTTP_BACKOFF_FACTOR`, or 0.5.
+    """
+    if pool_size is None:
+        pool_size = int(os.getenv("HTTP_POOL_SIZE", 10))
+    if max_retries is None:
+        max_retries = int(os.getenv("HTTP_MAX_RETRIES", 5))
+    if backoff_factor is None:
+        backoff_factor = float(os.getenv("HTTP_BACKOFF_FACTOR", 0.5))
+
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        backoff_jitter=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    return session
+
+
+def get_session():
+    """
+    Returns the process-wide session, creating it on first use.
+    """
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            _session = create_session()
+
+    return _session
+
+
+def close_session():
+    global _session
+
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def get_timeout():
+    connect_timeout = float(os.getenv("HTTP_CONNECT_TIMEOUT", 10))
+    read_timeout = float(os.getenv("HTTP_READ_TIMEOUT", 30))
+
+    return connect_timeout, read_timeout
+
+
+def fetch(url, timeout=None, **kwargs):
+    """
+    Sends a GET request through the shared session and raises on 4xx/5xx responses.
+    The latency of every request is recorded in REQUEST_STATS.
+    """
+    if timeout is None:
+        timeout = get_timeout()
+
+    start = time.perf_counter()
+    try:
+        response = get_session().get(url, timeout=timeout, **kwargs)
+        response.raise_for_status()
+    except requests.RequestException:
+        REQUEST_STATS.record(time.perf_counter() - start, failed=True)
+        raise
+
+    REQUEST_STATS.record(time.perf_counter() - start)
+
+    return response
+
+
+# Caching Functions
+@dataclass
+class CachedResponse:
+    content: bytes
+    etag: str = None
+    last_modified: str = None
+    fetched_at: float = 0.0
+
+    def is_fresh(self, ttl):
+        return time.time() - self.fetched_at < ttl
+
+    def validators(self):
+        """
+        Returns the headers of a conditional request that revalidates this response.
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+
+        return headers
+
+
+class ResponseCache:
+    """
+    On-disk cache of page bodies keyed by the SHA-256 of their URL. Bodies are stored
+    gzip-compressed next to a JSON file holding their validators (ETag, Last-Modified).
+    Entries older than `ttl` seconds are revalidated with a conditional request, and
+    the least recently used entries are evicted once the cache grows past `max_bytes`.
+    In `offline` mode cached bodies are served regardless of their age and misses raise.
+    """
+
+    def __init__(self, directory, ttl=3600, max_bytes=1 << 30, offline=False):
+        os.makedirs(directory, exist_ok=True)
+
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.lock = threading.Lock()
+        self.size = sum(size for _, size, _ in self.entries())
+
+    def paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        prefix = os.path.join(self.directory, key[:2], key)
+
+        return f"{prefix}.html.gz", f"{prefix}.json"
+
+    def entries(self):
+        """
+        Yields (body path, size, last used) for every cached body.
+        """
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".html.gz"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield path, stat.st_size, stat.st_mtime
+
+    def get(self, url):
+        body_path, meta_path = self.paths(url)
+        try:
+            with open(meta_path) as file:
+                meta = json.load(file)
+            with open(body_path, "rb") as file:
+                content = gzip.decompress(file.read())
+
+            # The modification time of the body tracks its last use for eviction. It
+            # may have been evicted by another thread since it was read.
+            os.utime(body_path)
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+
+        return CachedResponse(content, **meta)
+
+    def put(self, url, content, headers):
+        body_path, meta_path = self.paths(url)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+
+        meta = {
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+        }
+        body = gzip.compress(content)
+
+        with self.lock:
+            try:
+                previous_size = os.path.getsize(body_path)
+            except FileNotFoundError:
+                previous_size = 0
+
+            write_atomic(body_path, body)
+            write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+            self.size += len(body) - previous_size
+
+            if self.size > self.max_bytes:
+                self.evict()
+
+    def touch(self, url):
+        """
+        Marks a revalidated entry as fresh again. Returns False if the entry has been
+        evicted since it was read.
+        """
+        _, meta_path = self.paths(url)
+        with self.lock:
+            try:
+                with open(meta_path) as file:
+                    meta = json.load(file)
+            except (FileNotFoundError, ValueError):
+                return False
+
+            meta["fetched_at"] = time.time()
+            write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+
+        return True
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache is back under 90% of
+        `max_bytes`. Must be called with the lock held.
+        """
+        target = self.max_bytes * 0.9
+        for body_path, size, _ in sorted(self.entries(), key=lambda entry: entry[2]):
+            if self.size <= target:
+                break
+
+            for path in (body_path, body_path.replace(".html.gz", ".json")):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self.size -= size
+
+
+def write_atomic(path, data):
+    temp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(data)
+    os.replace(temp_path, path)
+
+
+def get_response_cache():
+    """
+    Returns the process-wide response cache, or None if `HTTP_CACHE_DIR` is not set.
+    The cache is tuned with `HTTP_CACHE_TTL` (seconds), `HTTP_CACHE_MAX_BYTES` and
+    `HTTP_CACHE_OFFLINE`.
+    """
+    global _response_cache
+
+    directory = os.getenv("HTTP_CACHE_DIR")
+    if not directory:
+        return None
+
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(
+                directory,
+                ttl=float(os.getenv("HTTP_CACHE_TTL", 3600)),
+                max_bytes=int(os.getenv("HTTP_CACHE_MAX_BYTES", 1 << 30)),
+                offline=os.getenv("HTTP_CACHE_OFFLINE", "").lower() in ("1", "true"),
+            )
+
+    return _response_cache
+
+
+def fetch_content(url, rate_limiter=None, cache=None):
+    """
+    Returns the body of the page, served from the response cache when one is configured.
+    Stale entries are revalidated with ETag/Last-Modified; a 304 reuses the cached body.
+    The rate limiter is only applied to requests that actually reach the website.
+    """
+    if cache is None:
+        cache = get_response_cache()
+    if cache is None:
+        if rate_limiter:
+            rate_limiter.acquire(url)
+        return fetch(url).content
+
+    cached = cache.get(url)
+    if cached and (cache.offline or cached.is_fresh(cache.ttl)):
+        return cached.content
+    if cache.offline:
+        raise LookupError(f"{url} is not cached and the response cache is offline.")
+
+    if rate_limiter:
+        rate_limiter.acquire(url)
+    response = fetch(url, headers=cached.validators() if cached else None)
+    if response.status_code == 304 and cached:
+        if cache.touch(url):
+            return cached.content
+
+        # Evicted while it was revalidated, so it is fetched again as a cache miss
+        response = fetch(url)
+
+    cache.put(url, response.content, response.headers)
+
+    return response.content
@@ -0,0 +1,152 @@
+import glob
+import os
+from datetime import datetime
+
+import joblib
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+RAW_DATA_DIR = "data/raw_data"
+PROCESSED_DATA_DIR = "data/processed_data"
+FEATURES_DIR = "data/features"
+MODELS_DIR = "data/models"
+
+SNAPSHOT_PARTITIONING = ds.partitioning(
+    pa.schema([("load_date", pa.string())]), flavor="hive"
+)
+
+
+# Snapshot Functions
+def write_snapshot(
+    df: pd.DataFrame, root: str, load_date=None, part: int = 0, schema=None
+):
+    """
+    Writes a DataFrame as one zstd-compressed Parquet file of the snapshot dataset at
+    `root`, partitioned Hive-style by load date: `<root>/load_date=<YYYY-MM-DD>/`.
+    Dtypes are kept, and list columns are stored as native Arrow lists rather than
+    stringified Python lists. Rewriting the same `part` of a load date replaces it, so
+    a rerun does not duplicate rows; streamed chunks are written as successive parts.
+
+    Args:
+        df (pd.DataFrame): Rows of the snapshot.
+        root (str): Directory of the dataset, e.g. `RAW_DATA_DIR` or `PROCESSED_DATA_DIR`.
+        load_date: Date of the load the rows belong to. Defaults to today.
+        part (int): Index of the chunk within the load date.
+        schema (pa.Schema): Types of the columns, e.g. from
+            `data_pipeline.schema.arrow_schema`, so every part of the dataset has the
+            same types whatever its rows. Defaults to the types inferred from `df`.
+
+    Returns:
+        str: Path of the written file.
+    """
+    if load_date is None:
+        load_date = datetime.now().date()
+    load_date = str(pd.Timestamp(load_date).date())
+
+    directory = os.path.join(root, f"load_date={load_date}")
+    os.makedirs(directory, exist_ok=True)
+    file_path = os.path.join(directory, f"part-{part:05d}.parquet")
+
+    table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+    pq.write_table(table, file_path, compression="zstd")
+
+    return file_path
+
+
+def read_snapshot(root: str, columns=None, load_dates=None, memory_map=True):
+    """
+    Reads the snapshot dataset at `root` back into a DataFrame. Only the requested
+    `columns` are decoded and only the partitions of `load_dates` are opened, so a
+    model can load the handful of columns it trains on without parsing the
+    descriptions. Files are memory-mapped instead of read into buffers.
+
+    Args:
+        root (str): Directory of the dataset.
+        columns (list): Columns to read. Defaults to all of them, plus `load_date`.
+        load_dates (list): Load dates to read. Defaults to all of them.
+        memory_map (bool): Whether to memory-map the files.
+    """
+    file_paths = list_snapshot_files(root, load_dates)
+    if not file_paths:
+        raise FileNotFoundError(f"No snapshot found in {root} for {load_dates}.")
+
+    table = pq.read_table(
+        file_paths,
+        columns=columns,
+        memory_map=memory_map,
+        partitioning=SNAPSHOT_PARTITIONING,
+    )
+
+    df = table.to_pandas()
+    # Arrow lists convert to numpy arrays, the pipeline works with Python lists
+    for field in table.schema:
+        if pa.types.is_list(field.type):
+            df[field.name] = table.column(field.name).to_pylist()
+
+    return df
+
+
+def list_snapshot_files(root: str, load_dates=None):
+    """
+    Returns the Parquet files of the snapshot dataset at `root`, restricted to
+    `load_dates` when given. Other files kept in the directory (e.g. CSVs) are ignored.
+    """
+    if load_dates is None:
+        load_dates = list_snapshot_dates(root)
+
+    file_paths = []
+    for load_date in load_dates:
+        load_date = str(pd.Timestamp(load_date).date())
+        pattern = os.path.join(root, f"load_date={load_date}", "*.parquet")
+        file_paths.extend(sorted(glob.glob(pattern)))
+
+    return file_paths
+
+
+def list_snapshot_dates(root: str):
+    """
+    Returns the load dates present in the snapshot dataset at `root`, oldest first.
+    """
+    if not os.path.isdir(root):
+        return []
+
+    return sorted(
+        name.split("=", 1)[1]
+        for name in os.listdir(root)
+        if name.startswith("load_date=")
+    )
+
+
+# Model Functions
+def save_bundle(bundle: dict, file_path: str):
+    """
+    Saves a model bundle (the fitted model and the encoders its features need) with
+    joblib. The file is left uncompressed so `load_bundle` can memory-map its arrays,
+    and it is written under a temporary name then renamed, so a predictor starting
+    meanwhile never loads a partly written bundle.
+
+    Args:
+        bundle (dict): Fitted objects, e.g. `{"model": ..., "encoder": ...}`.
+        file_path (str): Destination, usually under `MODELS_DIR`.
+
+    Returns:
+        str: Path of the written file.
+    """
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    tmp_path = f"{file_path}.tmp"
+    joblib.dump(bundle, tmp_path)
+    os.replace(tmp_path, file_path)
+
+    return file_path
+
+
+def load_bundle(file_path: str, mmap_mode="r"):
+    """
+    Loads a model bundle written by `save_bundle`. With `mmap_mode`, the numpy arrays of
+    the bundle (e.g. the trees of a gradient boosting model) are memory-mapped
+    read-only, so startup does not copy them and processes serving the same file share
+    its pages.
+    """
+    return joblib.load(file_path, mmap_mode=mmap_mode)
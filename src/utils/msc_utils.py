@@ -1,15 +1,21 @@
 import logging
 import os
-
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.common.by import By
+import threading
+from queue import Empty, Full, Queue
 
 
 # Extraction Common Functions
+# Link of the listings sorted by most recent on the first results page
+SORT_RECENT_SELECTOR = "#order-listing > li:nth-child(3) > a"
+
+
+# Selenium is imported lazily: it is only needed when the browser fallback is enabled.
 def initialize_web_driver(path):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    from webdriver_manager.chrome import ChromeDriverManager
+
     chrome_options = Options()
     chrome_options.add_argument("--headless")  # Ensure Chrome runs headless
     chrome_options.add_argument("--no-sandbox")  # Bypass OS security model
@@ -40,12 +46,70 @@ def initialize_web_browser(driver, url):
 
 
 def sort_listings(driver):
-    sort_recent = driver.find_element(
-        By.CSS_SELECTOR, "#order-listing > li:nth-child(3) > a"
-    )
+    """
+    Clicks "sort by recent" and returns the URL of the sorted listings.
+    """
+    from selenium.webdriver.common.by import By
+
+    sort_recent = driver.find_element(By.CSS_SELECTOR, SORT_RECENT_SELECTOR)
+    sorted_url = sort_recent.get_attribute("href")
 
     sort_recent.click()
 
+    return sorted_url
+
+
+# Streaming Functions
+def prefetch(iterable, max_pending=2):
+    """
+    Consumes `iterable` on a background thread and yields its items, buffering at most
+    `max_pending` of them. This lets a producer (e.g. the scraper) keep working while the
+    consumer (e.g. the loader) processes the previous item. Exceptions raised by the
+    producer are re-raised in the consumer.
+    """
+    queue = Queue(maxsize=max_pending)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((None, item)):
+                    return
+        except Exception as error:
+            put((error, None))
+        else:
+            put((None, done))
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    try:
+        while True:
+            try:
+                error, item = queue.get(timeout=0.1)
+            except Empty:
+                if not producer.is_alive() and queue.empty():
+                    return
+                continue
+
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        stop.set()
+
 
 # Logging Functions
 def get_logger(
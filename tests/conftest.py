@@ -0,0 +1,55 @@
+import os
+import sys
+
+# The modules are imported from `src`, as with the PYTHONPATH of the README
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), "rb") as file:
+        return file.read()
+
+
+def make_listing(number):
+    """
+    A staging row, with the missing and malformed values the website produces.
+    """
+    listing = {
+        "listing_id": f"prd-{number}",
+        "dealer_id": str(300_000 + number % 50),
+        "listing_title": f"2020 Toyota Hilux G 4x2 A/T {number} for sale",
+        "listing_price": "  ₱1,048,000  ",
+        "listing_location": " Metro Manila, Quezon City\r\n            ",
+        "listing_url": f"/toyota-hilux-for-sale-in-quezon-city/aid{number}",
+        "detail_date_posted": f"Posted on {number % 28 + 1:02d}/08/2024",
+        "detail_make": "Toyota",
+        "detail_model": "Hilux",
+        "detail_year": "2020",
+        "detail_status": "Used",
+        "detail_color": "Silver",
+        "detail_transmission": "Automatic",
+        "detail_mileage": "28,800km",
+        "detail_coding": "5/6 - Wednesday",
+        "detail_features": ["Driver and Passenger Airbags"],
+        "negotiation_and_test_drive": ["", "Negotiable", ""],
+        "additional_services": ["Financing", "Trade in"],
+        "complete_listing_description": "First owned.\r\n  Good running condition.",
+        "detail_price": f"₱ {number + 1},048,000",
+    }
+
+    cases = {
+        2: {"detail_mileage": None},
+        3: {"detail_mileage": "N/A"},
+        5: {"listing_location": "\u00a0Cebu, Cebu City\t "},
+        7: {"listing_location": None},
+        11: {"detail_date_posted": ""},
+        13: {"detail_date_posted": None},
+        17: {"complete_listing_description": None},
+    }
+    for divisor, values in cases.items():
+        if number % divisor == 0:
+            listing.update(values)
+
+    return listing
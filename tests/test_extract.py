@@ -0,0 +1,277 @@
+import os
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+import requests
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from conftest import read_fixture
+from data_pipeline.extract import extract_chunks
+from data_pipeline.load import extract_to_staging
+from data_pipeline.schema import RAW_SCHEMA
+from utils.checkpoint_utils import ScrapeCheckpoint
+from utils.db_utils import get_db_engine
+from utils.msc_utils import prefetch
+
+
+# Cards the results pages mix in with the listings
+ID_LESS_CARD = (
+    '<div class="col-4 listing-item" data-dealerid="300">'
+    '<a href="/listing/90"><h3 class="title">Toyota Vios 90</h3></a></div>'
+)
+AD_CARD = '<div class="col-4 listing-item" id="ads-1"><h3 class="title">Ad</h3></div>'
+
+
+def make_card(number):
+    if isinstance(number, str):
+        return number
+
+    return (
+        f'<div class="col-4 listing-item" id="prd-{number}" data-dealerid="300">'
+        f'<a href="/listing/{number}"><h3 class="title">Toyota Vios {number}</h3></a>'
+        '<div class="price-repossessed">₱548,000</div>'
+        '<div class="location">Metro Manila, Quezon City</div></div>'
+    )
+
+
+class ListingsSite(ThreadingHTTPServer):
+    """
+    Serves `pages` (lists of listing numbers or cards) as the results pages
+    `/cars/p<n>`, then the no-results page. Details pages are served at `/listing/<n>`,
+    posted yesterday, except for the `missing` listings, which are answered with 404.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, pages):
+        super().__init__(("127.0.0.1", 0), ListingsSiteHandler)
+        self.pages = pages
+        self.missing = set()
+        self.lock = threading.Lock()
+        self.requested = []
+
+        yesterday = (datetime.now() - timedelta(days=1)).strftime("%d/%m/%Y")
+        self.details_page = read_fixture("details_page.html").replace(
+            b"Posted on 04/07/2024", f"Posted on {yesterday}".encode()
+        )
+
+    @property
+    def url(self):
+        host, port = self.server_address
+        return f"http://{host}:{port}"
+
+    def requested_pages(self):
+        return [int(path[len("/cars/p") :]) for path in self.requested if "/p" in path]
+
+    def requested_listings(self):
+        # Details pages are fetched concurrently, so in no particular order
+        return sorted(
+            int(path.rsplit("/", 1)[-1]) for path in self.requested if "/p" not in path
+        )
+
+
+class ListingsSiteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        site = self.server
+        with site.lock:
+            site.requested.append(self.path)
+
+        status = 200
+        if self.path.startswith("/cars/p"):
+            page = int(self.path[len("/cars/p") :])
+            if page <= len(site.pages):
+                cards = "".join(make_card(number) for number in site.pages[page - 1])
+                body = f"<html><body>{cards}</body></html>".encode()
+            else:
+                body = read_fixture("no_results_page.html")
+        elif int(self.path.rsplit("/", 1)[-1]) in site.missing:
+            status, body = 404, b"Not Found"
+        else:
+            body = site.details_page
+
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def make_site(monkeypatch):
+    for name in ("HTTP_CACHE_DIR", "HTML_PARSER", "CHROMEBROWSER_URL", "USE_BROWSER"):
+        monkeypatch.delenv(name, raising=False)
+    sites = []
+
+    def make(pages):
+        site = ListingsSite(pages)
+        threading.Thread(target=site.serve_forever, daemon=True).start()
+        monkeypatch.setenv("LISTINGS_URL", f"{site.url}/cars")
+        sites.append(site)
+        return site
+
+    yield make
+    for site in sites:
+        site.shutdown()
+        site.server_close()
+
+
+def scrape(site, **kwargs):
+    kwargs = {"is_incremental": False, "rate_limit": 1000, **kwargs}
+    return extract_chunks(site.url, **kwargs)
+
+
+def listing_ids(chunks):
+    return [listing_id for chunk in chunks for listing_id in chunk["listing_id"]]
+
+
+def test_chunks_are_cut_at_page_boundaries(make_site):
+    pages = [[1, 2, 3], [4, 5, 6], [7, 8, 9], [10, 11, 12], [13, 14]]
+    site = make_site(pages)
+
+    chunks = list(scrape(site, chunk_size=5))
+
+    assert [len(chunk) for chunk in chunks] == [6, 6, 2]
+    assert [chunk.attrs["last_page"] for chunk in chunks] == [2, 4, 5]
+    assert listing_ids(chunks) == [f"prd-{number}" for number in range(1, 15)]
+    assert site.requested_pages() == [1, 2, 3, 4, 5, 6]
+
+
+def test_unchunked_run_yields_one_chunk(make_site):
+    site = make_site([[1, 2, 3], [4, 5]])
+
+    chunks = list(scrape(site, chunk_size=None))
+
+    assert [len(chunk) for chunk in chunks] == [5]
+    assert chunks[0].attrs["last_page"] == 2
+
+
+def test_empty_run_yields_an_empty_chunk(make_site):
+    site = make_site([])
+
+    chunks = list(scrape(site))
+
+    assert [len(chunk) for chunk in chunks] == [0]
+    assert list(chunks[0].columns) == list(RAW_SCHEMA)
+
+
+def test_prefetched_scrape_errors_are_raised_in_the_consumer(make_site):
+    site = make_site([[1, 2, 3], [4, 5, 6], [7, 8, 9]])
+    site.missing.add(5)
+
+    chunks = prefetch(scrape(site, chunk_size=3))
+
+    assert listing_ids([next(chunks)]) == ["prd-1", "prd-2", "prd-3"]
+    with pytest.raises(requests.HTTPError):
+        next(chunks)
+    # The scrape stopped at the failed page
+    assert max(site.requested_pages()) == 2
+
+
+def test_incremental_scrape_stops_on_the_first_known_page(make_site):
+    site = make_site(
+        [
+            [1, 2, ID_LESS_CARD, AD_CARD],
+            [3, 4, ID_LESS_CARD, AD_CARD],
+            [5, 6],
+        ]
+    )
+
+    chunks = list(
+        scrape(site, is_incremental=True, seen_listing_ids={"prd-2", "prd-3", "prd-4"})
+    )
+
+    assert listing_ids(chunks) == ["prd-1"]
+    assert site.requested_pages() == [1, 2]
+    assert site.requested_listings() == [1]
+
+
+def load(chunks, checkpoint, loaded):
+    """
+    Stands in for `extract_to_staging`: commits each chunk once it is "written".
+    """
+    for chunk in prefetch(chunks):
+        loaded.extend(chunk["listing_id"])
+        checkpoint.commit(chunk)
+
+
+def test_interrupted_scrape_resumes_from_the_checkpoint(make_site, tmp_path):
+    site = make_site([[1, 2, 3], [4, 5, 6], [7, 8, 9]])
+    site.missing.add(8)
+    path = str(tmp_path / "full_load.sqlite")
+
+    checkpoint = ScrapeCheckpoint(path)
+    table_name = checkpoint.setdefault("staging_table", "raw_incremental_load_20240801")
+    loaded = []
+    with pytest.raises(requests.HTTPError):
+        load(scrape(site, chunk_size=3, checkpoint=checkpoint), checkpoint, loaded)
+    checkpoint.close()
+
+    assert loaded == [f"prd-{number}" for number in range(1, 7)]
+
+    # The next run starts on another day, and listing 6 has moved to page 3
+    site.missing.clear()
+    site.pages[2] = [6, 7, 8, 9]
+    site.requested.clear()
+
+    checkpoint = ScrapeCheckpoint(path)
+    assert (
+        checkpoint.setdefault("staging_table", "raw_incremental_load_20240802")
+        == table_name
+    )
+    load(scrape(site, chunk_size=3, checkpoint=checkpoint), checkpoint, loaded)
+
+    assert site.requested_pages() == [3, 4]
+    assert site.requested_listings() == [7, 8, 9]
+    assert loaded == [f"prd-{number}" for number in range(1, 10)]
+    assert checkpoint.last_page() == 3
+
+
+@pytest.fixture
+def staging_engine():
+    if not os.getenv("DB_HOST"):
+        pytest.skip("No database is configured.")
+
+    engine = get_db_engine("staging")
+    try:
+        engine.connect().close()
+    except OperationalError:
+        pytest.skip("The staging database is not reachable.")
+
+    yield engine
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS test_extract_resume"))
+
+
+def test_resumed_load_appends_to_the_staging_table(make_site, tmp_path, staging_engine):
+    site = make_site([[1, 2, 3], [4, 5, 6], [7, 8, 9]])
+    site.missing.add(8)
+    checkpoint = ScrapeCheckpoint(str(tmp_path / "full_load.sqlite"))
+
+    def run():
+        extract_to_staging(
+            "staging",
+            "test_extract_resume",
+            scrape(site, chunk_size=3, checkpoint=checkpoint),
+            is_incremental=False,
+            checkpoint=checkpoint,
+        )
+
+    with pytest.raises(requests.HTTPError):
+        run()
+    site.missing.clear()
+    run()
+
+    loaded = pd.read_sql(
+        "SELECT listing_id FROM test_extract_resume ORDER BY listing_id",
+        staging_engine,
+    )
+    assert loaded["listing_id"].tolist() == [f"prd-{number}" for number in range(1, 10)]
@@ -0,0 +1,140 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from conftest import read_fixture
+from data_pipeline.extract import (
+    DETAILS_PAGE_STRAINER,
+    extract_additional_details,
+    fetch_page_soups,
+)
+from utils.http_utils import HostRateLimiter, TokenBucket
+
+LISTINGS = 12
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    Serves the details page fixture at `/listing/<n>`, with `<n>` as its date posted.
+    Lower numbers are answered more slowly, so the pages complete out of order.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.page = read_fixture("details_page.html")
+        self.lock = threading.Lock()
+        self.requested_at = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def url(self):
+        host, port = self.server_address
+        return f"http://{host}:{port}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requested_at.append(time.monotonic())
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+
+        try:
+            number = int(self.path.rsplit("/", 1)[-1])
+            time.sleep((LISTINGS - number) * 0.01)
+            body = server.page.replace(
+                b"Posted on 04/07/2024", f"Posted on {number}".encode()
+            )
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.delenv("HTTP_CACHE_DIR", raising=False)
+    monkeypatch.delenv("HTML_PARSER", raising=False)
+
+    server = StubServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def listing_urls(server):
+    return [f"{server.url}/listing/{number}" for number in range(LISTINGS)]
+
+
+def test_fetch_page_soups_keeps_url_order(server):
+    soups = fetch_page_soups(
+        listing_urls(server),
+        HostRateLimiter(1000, capacity=4),
+        max_workers=4,
+        parse_only=DETAILS_PAGE_STRAINER,
+    )
+
+    dates = [extract_additional_details(soup)["detail_date_posted"] for soup in soups]
+    assert dates == [f"Posted on {number}" for number in range(LISTINGS)]
+    assert server.max_in_flight > 1
+
+
+def test_fetch_page_soups_is_rate_limited(server):
+    rate = 20
+    fetch_page_soups(listing_urls(server), HostRateLimiter(rate), max_workers=4)
+
+    # With a capacity of 1, requests are at least 1 / rate seconds apart on average
+    requested_at = sorted(server.requested_at)
+    assert len(requested_at) == LISTINGS
+    assert requested_at[-1] - requested_at[0] >= (LISTINGS - 1) / rate * 0.9
+
+
+def test_token_bucket_allows_rate_with_bursts_of_capacity():
+    rate, capacity = 50, 5
+    bucket = TokenBucket(rate, capacity)
+
+    acquired_at = []
+    for _ in range(30):
+        bucket.acquire()
+        acquired_at.append(time.monotonic())
+
+    # No window holds more than the burst plus the tokens refilled during it
+    for first in range(len(acquired_at)):
+        for last in range(first, len(acquired_at)):
+            window = acquired_at[last] - acquired_at[first]
+            assert last - first + 1 <= capacity + rate * window + 1e-6
+
+
+def test_token_bucket_rejects_non_positive_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(0)
+
+
+def test_host_rate_limiter_throttles_hosts_independently():
+    limiter = HostRateLimiter(rate=5)
+
+    start = time.monotonic()
+    for host in ("first.example", "second.example", "third.example"):
+        limiter.acquire(f"http://{host}/listing/1")
+    assert time.monotonic() - start < 0.1
+
+    limiter.acquire("http://first.example/listing/2")
+    assert time.monotonic() - start >= 0.9 / 5
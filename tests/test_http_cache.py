@@ -0,0 +1,101 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils import http_utils
+from utils.http_utils import ResponseCache, fetch_content
+
+PAGE = b"<html><body><div class='date-post'>Posted on 04/07/2024</div></body></html>"
+ETAG = '"listing-1"'
+
+
+class RevalidatingHandler(BaseHTTPRequestHandler):
+    """
+    Answers conditional requests carrying the current ETag with a 304.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.requests.append(self.headers.get("If-None-Match"))
+
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RevalidatingHandler)
+    server.daemon_threads = True
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    host, port = server.server_address
+    yield server, f"http://{host}:{port}/listing/1"
+    server.shutdown()
+    server.server_close()
+
+
+def test_get_is_a_miss_when_evicted_after_read(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path))
+    cache.put("http://example.com/1", PAGE, {})
+    body_path, _ = cache.paths("http://example.com/1")
+
+    # Another thread evicts the entry between the read and the last use update
+    def evict_then_utime(path, *args, **kwargs):
+        os.remove(path)
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(http_utils.os, "utime", evict_then_utime)
+    assert cache.get("http://example.com/1") is None
+
+
+def test_touch_is_false_when_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.put("http://example.com/1", PAGE, {})
+    assert cache.touch("http://example.com/1")
+
+    with cache.lock:
+        cache.max_bytes = 0
+        cache.evict()
+    assert not cache.touch("http://example.com/1")
+
+
+def test_revalidation_of_an_evicted_entry_fetches_again(tmp_path, monkeypatch, url):
+    server, url = url
+    cache = ResponseCache(str(tmp_path), ttl=0)
+    assert fetch_content(url, cache=cache) == PAGE
+
+    # The entry is evicted after the cached response was read, before the 304
+    get = cache.get
+
+    def get_then_evict(url):
+        cached = get(url)
+        with cache.lock:
+            cache.max_bytes = 0
+            cache.evict()
+            cache.max_bytes = 1 << 30
+        return cached
+
+    monkeypatch.setattr(cache, "get", get_then_evict)
+    assert fetch_content(url, cache=cache) == PAGE
+    assert server.requests == [None, ETAG, None]
+
+    monkeypatch.undo()
+    assert cache.get(url).content == PAGE
@@ -0,0 +1,139 @@
+import os
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from data_pipeline.load import copy_insert, format_array_item, format_copy_value
+from utils.db_utils import get_db_engine
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (None, ""),
+        ("", '""'),
+        ("plain", '"plain"'),
+        ("tab\there", '"tab\there"'),
+        ("two\r\nlines", '"two\r\nlines"'),
+        ("back\\slash", '"back\\slash"'),
+        ('say "hi", twice', '"say ""hi"", twice"'),
+        (2020, '"2020"'),
+        ([], '"{}"'),
+        (["Financing", "Trade in"], '"{Financing,""Trade in""}"'),
+    ],
+)
+def test_format_copy_value(value, expected):
+    assert format_copy_value(value) == expected
+
+
+@pytest.mark.parametrize(
+    "item, expected",
+    [
+        (None, "NULL"),
+        ("ABS", "ABS"),
+        ("", '""'),
+        ("null", '"null"'),
+        ("Trade in", '"Trade in"'),
+        ("tab\there", '"tab\there"'),
+        ("two\nlines", '"two\nlines"'),
+        ("a,b", '"a,b"'),
+        ("{braces}", '"{braces}"'),
+        ('say "hi"', '"say \\"hi\\""'),
+        ("back\\slash", '"back\\\\slash"'),
+    ],
+)
+def test_format_array_item(item, expected):
+    assert format_array_item(item) == expected
+
+
+def test_list_with_quotes_and_commas_is_quoted_twice():
+    # Array quoting first, then CSV quoting of the whole literal
+    assert (
+        format_copy_value(['a "b"', "c,d", None]) == '"{""a \\""b\\"""",""c,d"",NULL}"'
+    )
+
+
+class RecordingCursor:
+    rowcount = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def copy_expert(self, sql, buffer):
+        self.sql = sql
+        self.copied = buffer.read()
+
+
+def test_copy_insert_streams_csv_rows():
+    cursor = RecordingCursor()
+    conn = SimpleNamespace(connection=SimpleNamespace(cursor=lambda: cursor))
+    table = SimpleNamespace(schema=None, name="vehicle_data_prd")
+    rows = [
+        ("prd-1", "", ["ABS"], None),
+        ("prd-2", None, [], "a\tb\nc"),
+    ]
+
+    copy_insert(table, conn, ["listing_id", "note", "items", "text"], rows)
+
+    assert cursor.sql == (
+        'COPY "vehicle_data_prd" ("listing_id", "note", "items", "text") '
+        "FROM STDIN WITH (FORMAT csv)"
+    )
+    assert cursor.copied == '"prd-1","","{ABS}",\n"prd-2",,"{}","a\tb\nc"\n'
+
+
+@pytest.fixture
+def copy_table():
+    if not os.getenv("DB_HOST"):
+        pytest.skip("No database is configured.")
+
+    engine = get_db_engine("staging")
+    try:
+        engine.connect().close()
+    except OperationalError:
+        pytest.skip("The staging database is not reachable.")
+
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TABLE test_copy_insert "
+                "(position INTEGER, note TEXT, items TEXT[])"
+            )
+        )
+    yield engine
+
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS test_copy_insert"))
+
+
+def test_copy_insert_round_trips_through_postgres(copy_table):
+    data = pd.DataFrame(
+        {
+            "position": [1, 2, 3, 4],
+            "note": [None, "", "tab\tand\r\nnewline", 'back\\slash "quoted", comma'],
+            "items": [
+                [],
+                None,
+                ["", None, "null", "Trade in"],
+                ['say "hi"', "a,b", "back\\slash", "{braces}"],
+            ],
+        }
+    )
+
+    data.to_sql(
+        "test_copy_insert",
+        copy_table,
+        if_exists="append",
+        index=False,
+        method=copy_insert,
+    )
+
+    loaded = pd.read_sql("SELECT * FROM test_copy_insert ORDER BY position", copy_table)
+    assert loaded["note"].tolist() == data["note"].tolist()
+    assert loaded["items"].tolist() == data["items"].tolist()
@@ -0,0 +1,67 @@
+import pytest
+from bs4 import BeautifulSoup
+
+from conftest import read_fixture
+from data_pipeline.extract import (
+    DETAILS_PAGE_STRAINER,
+    LISTING_PAGE_STRAINER,
+    extract_additional_details,
+    extract_listing_info,
+    parse_page,
+)
+
+PARSERS = ["html.parser", "lxml"]
+
+LISTING_PAGES = ["listing_page.html", "no_results_page.html"]
+DETAILS_PAGES = ["details_page.html", "details_page_sparse.html"]
+
+
+def extract_listings(soup):
+    """
+    Reads a results page the way `extract_chunks` does.
+    """
+    return {
+        "no_results": soup.find(class_="box-no-results-search-v2") is not None,
+        "listings": [
+            extract_listing_info(car) for car in soup.find_all("div", class_="col-4")
+        ],
+    }
+
+
+# The dicts of the full "html.parser" tree are the ones the pipeline always produced
+@pytest.mark.parametrize("parser", PARSERS)
+@pytest.mark.parametrize("name", LISTING_PAGES)
+def test_listing_page_parity(monkeypatch, parser, name):
+    markup = read_fixture(name)
+    expected = extract_listings(BeautifulSoup(markup, "html.parser"))
+
+    monkeypatch.setenv("HTML_PARSER", parser)
+    assert extract_listings(parse_page(markup, LISTING_PAGE_STRAINER)) == expected
+
+
+@pytest.mark.parametrize("parser", PARSERS)
+@pytest.mark.parametrize("name", DETAILS_PAGES)
+def test_details_page_parity(monkeypatch, parser, name):
+    markup = read_fixture(name)
+    expected = extract_additional_details(BeautifulSoup(markup, "html.parser"))
+
+    monkeypatch.setenv("HTML_PARSER", parser)
+    assert extract_additional_details(parse_page(markup, DETAILS_PAGE_STRAINER)) == (
+        expected
+    )
+
+
+def test_fixtures_are_representative():
+    listings = extract_listings(
+        BeautifulSoup(read_fixture("listing_page.html"), "html.parser")
+    )
+    assert len(listings["listings"]) == 5
+    assert listings["listings"][0]["listing_id"] == "prd-852138"
+    assert listings["listings"][3]["listing_id"] is None
+
+    details = extract_additional_details(
+        BeautifulSoup(read_fixture("details_page.html"), "html.parser")
+    )
+    assert details["detail_make"] == "BMW"
+    assert details["detail_price"] == "₱ 1,198,000"
+    assert details["additional_services"][0] == "Financing"
@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+from conftest import make_listing
+from data_pipeline.extract import rows_to_df
+from data_pipeline.schema import (
+    LIST_COLUMNS,
+    PROCESSED_SCHEMA,
+    RAW_SCHEMA,
+    arrow_schema,
+    enforce_schema,
+)
+from utils.io_utils import read_snapshot, write_snapshot
+
+
+def make_raw_parts():
+    """
+    A part of complete listings, and one whose coding and list columns are all null.
+    """
+    complete = rows_to_df([make_listing(number) for number in range(1, 5)])
+
+    sparse = [make_listing(number) for number in range(5, 8)]
+    for listing in sparse:
+        listing["detail_coding"] = None
+        for col in LIST_COLUMNS:
+            listing[col] = None
+
+    return complete, rows_to_df(sparse)
+
+
+@pytest.mark.parametrize("sparse_first", [True, False])
+def test_parts_with_all_null_columns_are_read_together(tmp_path, sparse_first):
+    complete, sparse = make_raw_parts()
+    parts = [sparse, complete] if sparse_first else [complete, sparse]
+
+    for load_date, part in zip(["2024-08-01", "2024-08-02"], parts):
+        write_snapshot(part, str(tmp_path), load_date, schema=arrow_schema(RAW_SCHEMA))
+
+    data = read_snapshot(str(tmp_path))
+
+    assert len(data) == 7
+    assert str(data["detail_coding"].dtype) == "category"
+    for col in ["detail_coding", "detail_features"]:
+        assert data[col].tolist() == sum((part[col].tolist() for part in parts), [])
+
+
+def test_processed_types_round_trip(tmp_path):
+    data = enforce_schema(
+        pd.DataFrame(
+            {col: pd.Series([None, None], dtype="object") for col in PROCESSED_SCHEMA}
+        ),
+        PROCESSED_SCHEMA,
+    )
+    write_snapshot(
+        data, str(tmp_path), "2024-08-01", schema=arrow_schema(PROCESSED_SCHEMA)
+    )
+
+    read = read_snapshot(str(tmp_path)).drop(columns="load_date")
+    assert read.dtypes.astype(str).to_dict() == PROCESSED_SCHEMA
@@ -0,0 +1,84 @@
+import os
+import threading
+
+import pandas as pd
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from conftest import make_listing
+from data_pipeline.extract import rows_to_df
+from data_pipeline.load import load_to_staging_table
+from data_pipeline.transform import (
+    normalize_title,
+    transform,
+    transform_listing_title,
+)
+from utils.db_utils import get_db_engine
+
+WORDS = frozenset(["for", "sale"])
+
+
+def make_titles(count):
+    return pd.DataFrame(
+        {
+            "listing_title": [
+                f"2019 Toyota Vios 1.3 E #{number % 1_500} for sale ✅ Low Mileage"
+                for number in range(count)
+            ]
+        }
+    )
+
+
+def test_pool_titles_match_serial_titles_from_a_background_thread():
+    # The pipelines transform on a `prefetch` thread, where the pool must not fork
+    results = {}
+
+    def run():
+        results["pool"] = transform_listing_title(
+            make_titles(3_000), "listing_title", WORDS, n_jobs=2
+        )
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join(timeout=60)
+    assert not thread.is_alive()
+
+    normalize_title.cache_clear()
+    serial = transform_listing_title(make_titles(3_000), "listing_title", WORDS)
+
+    assert results["pool"]["listing_title"].tolist() == (
+        serial["listing_title"].tolist()
+    )
+    assert serial["listing_title"][0] == "2019 toyota vios 1.3 e #0 low mileage"
+
+
+@pytest.fixture
+def staging_table(monkeypatch):
+    monkeypatch.setenv("WORDS_TO_REMOVE", "for sale,sale")
+    if not os.getenv("DB_HOST"):
+        pytest.skip("No database is configured.")
+
+    engine = get_db_engine("staging")
+    try:
+        engine.connect().close()
+    except OperationalError:
+        pytest.skip("The staging database is not reachable.")
+
+    table_name = "test_transform_parity"
+    data = rows_to_df([make_listing(number) for number in range(500)])
+    load_to_staging_table(engine, data, table_name)
+    yield table_name
+
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
+
+
+def test_in_database_transform_matches_pandas(staging_table):
+    in_pandas = transform("staging", staging_table, True, in_database=False)
+    in_database = transform("staging", staging_table, True, in_database=True)
+
+    pd.testing.assert_frame_equal(in_pandas, in_database)
+    # Empty and missing dates posted are both NaT
+    is_missing = [number % 11 == 0 or number % 13 == 0 for number in range(500)]
+    assert in_database["detail_date_posted"].isna().tolist() == is_missing
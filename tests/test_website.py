@@ -0,0 +1,80 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from conftest import read_fixture
+from data_pipeline.extract import get_listings_page_url, initialize_website
+
+
+class ListingsHandler(BaseHTTPRequestHandler):
+    """
+    Serves the results page fixture, or one without the sort links at `/unsorted`.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = read_fixture("listing_page.html")
+        if self.path == "/unsorted":
+            body = body.replace(b'id="order-listing"', b'id="categories"')
+
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url(monkeypatch):
+    for name in ("LISTINGS_URL", "CHROMEBROWSER_URL", "USE_BROWSER", "HTTP_CACHE_DIR"):
+        monkeypatch.delenv(name, raising=False)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ListingsHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    host, port = server.server_address
+    yield f"http://{host}:{port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_sorted_url_is_read_from_the_sort_link(monkeypatch, server_url):
+    monkeypatch.setenv("CHROMEBROWSER_URL", f"{server_url}/cars-for-sale")
+
+    assert initialize_website() == f"{server_url}/cars-for-sale?sort=recent"
+
+
+def test_listings_url_is_used_as_is(monkeypatch, server_url):
+    monkeypatch.setenv("LISTINGS_URL", f"{server_url}/cars-for-sale?sort=newest")
+    monkeypatch.setenv("CHROMEBROWSER_URL", f"{server_url}/unsorted")
+
+    assert initialize_website() == f"{server_url}/cars-for-sale?sort=newest"
+
+
+def test_missing_sort_link_fails_fast(monkeypatch, server_url):
+    monkeypatch.setenv("CHROMEBROWSER_URL", f"{server_url}/unsorted")
+
+    with pytest.raises(LookupError):
+        initialize_website()
+
+
+def test_missing_urls_fail_fast(server_url):
+    with pytest.raises(ValueError):
+        initialize_website()
+
+
+def test_listings_page_url_keeps_the_sort_order():
+    assert (
+        get_listings_page_url("https://example.com/cars-for-sale?sort=recent", 2)
+        == "https://example.com/cars-for-sale/p2?sort=recent"
+    )
+    assert (
+        get_listings_page_url("https://example.com/cars-for-sale/", 1)
+        == "https://example.com/cars-for-sale/p1"
+    )